@@ -0,0 +1,130 @@
+"""Recall vs. latency of each INDEX_TYPE against the flat baseline.
+
+Builds every index mode through VectorIndexWriter over the same synthetic,
+clustered, unit-normalized corpus and reports build time, on-disk size,
+recall@k against exact flat search, single-query latency percentiles and
+batched throughput. ivfpq is measured with and without re-ranking its
+candidates against the exact stored vectors (``--refine``).
+
+Run from the backend directory:
+
+    python -m benchmarks.ann_benchmark --chunks 100000 --nprobe 8 16 --ef-search 64 128
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from services.vector_index import INDEX_TYPES, INDEX_FILE, VectorIndex, VectorIndexWriter
+
+def make_corpus(chunks: int, queries: int, dim: int, clusters: int, seed: int):
+    """Clustered unit vectors, roughly like sentence embeddings of related news stories"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+
+    def sample(n):
+        points = centers[rng.integers(0, clusters, size=n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+        return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+    return sample(chunks), sample(queries)
+
+def build(path: str, index_type: str, vectors: np.ndarray) -> float:
+    start = time.perf_counter()
+    writer = VectorIndexWriter(path, index_type=index_type)
+    for offset in range(0, len(vectors), 4096):
+        batch = vectors[offset:offset + 4096]
+        writer.add(batch, [{"text": ""}] * len(batch))
+    writer.close()
+    return time.perf_counter() - start
+
+def measure(index: VectorIndex, queries: np.ndarray, truth: np.ndarray, k: int, **params) -> dict:
+    _, rows = index.search(queries, k, **params)
+    recall = np.mean([len(set(r) & set(t)) / k for r, t in zip(rows, truth)])
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query[None, :], k, **params)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    index.search(queries, k, **params)
+    batch_time = time.perf_counter() - start
+
+    return {
+        "recall": float(recall),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "batch_qps": len(queries) / batch_time
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--refine", type=int, nargs="+", default=[0, 4], help="ivfpq exact re-ranking factors (0 disables)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    vectors, queries = make_corpus(args.chunks, args.queries, args.dim, args.clusters, args.seed)
+    root = tempfile.mkdtemp(prefix="ann-benchmark-")
+    results = []
+    try:
+        # Exact ground truth from the flat baseline
+        flat_path = os.path.join(root, "flat")
+        flat_build_time = build(flat_path, "flat", vectors)
+        _, truth = VectorIndex.load(flat_path).search(queries, args.k)
+
+        for index_type in args.types:
+            path = os.path.join(root, index_type)
+            if index_type == "flat":
+                build_time = flat_build_time
+            else:
+                build_time = build(path, index_type, vectors)
+            index = VectorIndex.load(path)
+            size_mb = os.path.getsize(os.path.join(path, INDEX_FILE)) / 1e6
+
+            if index.index_type == "ivfpq":
+                settings = [{"nprobe": nprobe, "refine": refine} for refine in args.refine for nprobe in args.nprobe]
+            elif index.index_type == "ivf":
+                settings = [{"nprobe": nprobe} for nprobe in args.nprobe]
+            elif index.index_type == "hnsw":
+                settings = [{"ef_search": ef} for ef in args.ef_search]
+            else:
+                settings = [{}]
+
+            for params in settings:
+                result = {
+                    "index_type": index.index_type,
+                    "params": params,
+                    "build_s": build_time,
+                    "index_mb": size_mb,
+                    **measure(index, queries, truth, args.k, **params)
+                }
+                results.append(result)
+                knob = ", ".join(f"{key}={value}" for key, value in params.items()) or "-"
+                print(
+                    f"{result['index_type']:>6} {knob:<20} recall@{args.k}={result['recall']:.3f} "
+                    f"p50={result['p50_ms']:.3f}ms p95={result['p95_ms']:.3f}ms "
+                    f"qps={result['batch_qps']:.0f} build={build_time:.1f}s size={size_mb:.1f}MB"
+                )
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
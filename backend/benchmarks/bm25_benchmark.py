@@ -0,0 +1,100 @@
+"""Latency overhead of hybrid retrieval: BM25 search plus reciprocal-rank fusion.
+
+Builds a BM25 index through BM25Writer over synthetic chunks whose words
+follow a Zipf distribution, like news text, then times single-query BM25
+search, fusing its candidates with a vector candidate list, and the on-disk
+size of the posting lists.
+
+Run from the backend directory:
+
+    python -m benchmarks.bm25_benchmark --chunks 100000 --candidates 20
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from services.bm25_index import BM25Index, BM25Writer, reciprocal_rank_fusion
+
+def make_corpus(chunks: int, queries: int, vocab: int, words: int, stopwords: int, seed: int):
+    """Zipf-distributed word ids rendered as text chunks and short keyword queries
+
+    The ``stopwords`` most frequent ranks stay in the chunks but are left out of
+    queries, the way tokenize() drops real stopwords from a question.
+    """
+    rng = np.random.default_rng(seed)
+    terms = [f"w{i}" for i in range(vocab)]
+
+    def sample(n, length, skip=0):
+        ids = np.minimum(rng.zipf(1.2, size=(n, length)) + skip, vocab) - 1
+        return [" ".join(terms[i] for i in row) for row in ids]
+
+    return sample(chunks, words), sample(queries, 6, stopwords)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--vocab", type=int, default=50000)
+    parser.add_argument("--words", type=int, default=150, help="Words per chunk")
+    parser.add_argument("--stopwords", type=int, default=50, help="Most frequent ranks never used in queries")
+    parser.add_argument("--candidates", type=int, default=20, help="Candidates per retriever (HYBRID_CANDIDATES)")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    texts, queries = make_corpus(args.chunks, args.queries, args.vocab, args.words, args.stopwords, args.seed)
+    root = tempfile.mkdtemp(prefix="bm25-benchmark-")
+    try:
+        start = time.perf_counter()
+        writer = BM25Writer()
+        for row, text in enumerate(texts):
+            writer.add(row, text)
+        writer.close(root)
+        build_time = time.perf_counter() - start
+        size_mb = sum(os.path.getsize(os.path.join(root, name)) for name in os.listdir(root)) / 1e6
+
+        index = BM25Index.load(root)
+        rng = np.random.default_rng(args.seed)
+        search_latencies = []
+        fusion_latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            keyword_rows = [row for row, _ in index.search(query, args.candidates)]
+            search_latencies.append(time.perf_counter() - start)
+
+            # Stand-in for the vector retriever's candidate list
+            vector_rows = rng.choice(args.chunks, size=args.candidates, replace=False).tolist()
+            start = time.perf_counter()
+            reciprocal_rank_fusion([vector_rows, keyword_rows], args.k)
+            fusion_latencies.append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    result = {
+        "build_s": build_time,
+        "index_mb": size_mb,
+        "search_p50_ms": float(np.percentile(search_latencies, 50) * 1000),
+        "search_p95_ms": float(np.percentile(search_latencies, 95) * 1000),
+        "search_p99_ms": float(np.percentile(search_latencies, 99) * 1000),
+        "fusion_p50_ms": float(np.percentile(fusion_latencies, 50) * 1000),
+        "fusion_p95_ms": float(np.percentile(fusion_latencies, 95) * 1000)
+    }
+    print(
+        f"chunks={args.chunks} build={build_time:.1f}s size={size_mb:.1f}MB "
+        f"bm25 p50={result['search_p50_ms']:.3f}ms p95={result['search_p95_ms']:.3f}ms "
+        f"p99={result['search_p99_ms']:.3f}ms rrf p50={result['fusion_p50_ms']:.3f}ms "
+        f"p95={result['fusion_p95_ms']:.3f}ms"
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "result": result}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Parity and latency of each embedding backend against full-precision PyTorch.
+
+Embeds the same texts with the reference backend (``torch``) and with each
+candidate (``torch-int8``, ``onnx``, ``onnx-int8``) and reports:
+
+- cosine similarity between the reference and candidate vector of each text
+  (mean, min, and 1st percentile),
+- recall@k of the candidate's nearest neighbours for a set of queries against
+  the reference neighbours, which is what retrieval quality depends on,
+- single-query latency percentiles and batched ingest throughput, with the
+  speedup over the reference.
+
+Texts come from ``--texts`` (one per line) or, by default, templated news-like
+sentences. The exit status is 1 if any candidate's mean cosine falls below
+``--min-cosine`` or its recall below ``--min-recall``. Needs sentence-transformers,
+and onnxruntime for the ONNX backends; the model is read from the local
+Hugging Face cache or downloaded.
+
+Run from the backend directory:
+
+    python -m benchmarks.embedding_parity --threads 4
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from services.embedding_backends import DEFAULT_EMBEDDING_MODEL, create_embeddings
+
+SUBJECTS = [
+    "The central bank", "Lawmakers", "A coalition of farmers", "The city council", "Investigators",
+    "The energy ministry", "Shareholders", "Health officials", "The striking workers", "Climate scientists",
+    "The opposition party", "A federal judge", "Tech regulators", "The national team", "Aid agencies"
+]
+VERBS = [
+    "raised concerns about", "voted to approve", "announced new limits on", "launched an inquiry into",
+    "warned of delays in", "reached an agreement over", "rejected the proposal for", "pledged funding for",
+    "reported record growth in", "called for an overhaul of"
+]
+OBJECTS = [
+    "interest rates", "the housing market", "wind farm subsidies", "drinking water standards",
+    "the rail network", "cross-border data transfers", "grain exports", "hospital waiting lists",
+    "the minimum wage", "satellite launches", "wildfire prevention", "public broadcasting",
+    "semiconductor supply chains", "teacher pay", "coastal flood defences"
+]
+DETAILS = [
+    "after weeks of negotiations", "citing new figures released on Monday", "despite strong opposition",
+    "ahead of next month's election", "following a series of protests", "in a statement late on Friday",
+    "as inflation continued to ease", "amid a shortage of skilled staff"
+]
+
+def make_texts(count: int, seed: int) -> List[str]:
+    """News-like sentences of one to four clauses"""
+    rng = np.random.default_rng(seed)
+    texts = []
+    for _ in range(count):
+        clauses = [
+            f"{SUBJECTS[rng.integers(len(SUBJECTS))]} {VERBS[rng.integers(len(VERBS))]} "
+            f"{OBJECTS[rng.integers(len(OBJECTS))]} {DETAILS[rng.integers(len(DETAILS))]}."
+            for _ in range(rng.integers(1, 5))
+        ]
+        texts.append(" ".join(clauses))
+    return texts
+
+def embed(embeddings, texts: List[str], batch_size: int) -> np.ndarray:
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embeddings.embed_documents(texts[start:start + batch_size]))
+    return np.array(vectors, dtype=np.float32)
+
+def measure_latency(embeddings, texts: List[str], queries: List[str], batch_size: int) -> Dict[str, float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        embeddings.embed_documents([query])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    embed(embeddings, texts, batch_size)
+    seconds = time.perf_counter() - start
+    return {
+        "query_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "query_p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "texts_per_s": len(texts) / seconds
+    }
+
+def neighbours(documents: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(queries @ documents.T), axis=1)[:, :k]
+
+def load_backend(spec: str, model: str, threads: int):
+    backend, _, precision = spec.partition("-")
+    return create_embeddings(model, backend=backend, quantize=precision == "int8", threads=threads)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--backends", nargs="+", default=["torch-int8", "onnx", "onnx-int8"],
+                        choices=["torch-int8", "onnx", "onnx-int8"])
+    parser.add_argument("--texts", help="File with one text per line instead of the templated sentences")
+    parser.add_argument("--count", type=int, default=2000, help="Number of templated texts")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=64, help="Ingest batch size, like EMBED_BATCH_SIZE")
+    parser.add_argument("--threads", type=int, default=0, help="EMBEDDING_THREADS; 0 keeps the library default")
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--min-recall", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.texts:
+        with open(args.texts) as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = make_texts(args.count, args.seed)
+    rng = np.random.default_rng(args.seed)
+    queries = [texts[i].split(". ")[0] for i in rng.choice(len(texts), size=min(args.queries, len(texts)), replace=False)]
+
+    reference = load_backend("torch", args.model, args.threads)
+    reference_docs = embed(reference, texts, args.batch_size)
+    reference_queries = embed(reference, queries, args.batch_size)
+    truth = neighbours(reference_docs, reference_queries, args.k)
+    baseline = measure_latency(reference, texts, queries, args.batch_size)
+    results = [{"backend": "torch", **baseline}]
+
+    for spec in args.backends:
+        candidate = load_backend(spec, args.model, args.threads)
+        docs = embed(candidate, texts, args.batch_size)
+        found = neighbours(docs, embed(candidate, queries, args.batch_size), args.k)
+        cosines = np.sum(docs * reference_docs, axis=1)
+        latency = measure_latency(candidate, texts, queries, args.batch_size)
+        results.append({
+            "backend": spec,
+            "cosine_mean": float(cosines.mean()),
+            "cosine_min": float(cosines.min()),
+            "cosine_p1": float(np.percentile(cosines, 1)),
+            "recall": float(np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])),
+            **latency,
+            "query_speedup": baseline["query_p50_ms"] / latency["query_p50_ms"],
+            "ingest_speedup": latency["texts_per_s"] / baseline["texts_per_s"]
+        })
+
+    print(f"{'backend':<12} {'cos mean':>9} {'cos min':>9} {f'recall@{args.k}':>10} {'query p50':>10} {'p95':>9} {'texts/s':>9} {'speedup':>13}")
+    for r in results:
+        parity = f"{r['cosine_mean']:>9.4f} {r['cosine_min']:>9.4f} {r['recall']:>10.3f}" if "recall" in r else f"{'-':>9} {'-':>9} {'-':>10}"
+        speedup = f"{r['query_speedup']:>5.2f}x/{r['ingest_speedup']:.2f}x" if "recall" in r else f"{'-':>13}"
+        print(f"{r['backend']:<12} {parity} {r['query_p50_ms']:>8.2f}ms {r['query_p95_ms']:>7.2f}ms {r['texts_per_s']:>9.0f} {speedup:>13}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+    failed = [
+        r["backend"] for r in results
+        if "recall" in r and (r["cosine_mean"] < args.min_cosine or r["recall"] < args.min_recall)
+    ]
+    if failed:
+        print(f"\nBelow parity thresholds: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Feed parsing and HTML cleaning throughput, and how much it stalls the event loop.
+
+Builds a synthetic corpus of ``--feeds`` RSS feeds with realistic item markup
+and reports:
+
+1. Entries per CPU second of each HTML cleaner (bs4, lxml, regex) on one
+   core, and the share of articles whose text matches the bs4 output.
+2. Wall-clock entries/sec of FeedParserPool with 1 up to ``--max-workers``
+   parser processes.
+3. Event-loop lag (how late a 1 ms ticker wakes up) while the corpus is parsed
+   inline on the loop, the way RSSService used to, versus on the pool.
+
+Run from the backend directory:
+
+    python -m benchmarks.feed_parse_benchmark --feeds 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.pipeline_benchmark import percentiles
+from benchmarks.stub_servers import SyntheticFeedServer
+from services.feed_parser import CLEANERS, FeedParserPool, available_cpus, parse_feed
+
+def cleaner_throughput(feeds: List[bytes]) -> Dict:
+    """Single-core entries per CPU second of each cleaner, and its agreement with bs4"""
+    results = {}
+    reference = None
+    for cleaner in ("bs4",) + tuple(c for c in CLEANERS if c != "bs4"):
+        texts = []
+        entries = 0
+        start = time.process_time()
+        for content in feeds:
+            articles, stats = parse_feed(content, "bench", cleaner)
+            entries += stats["entries"]
+            texts.extend(article["content"] for article in articles)
+        seconds = time.process_time() - start
+        if reference is None:
+            reference = texts
+        matching = sum(a == b for a, b in zip(texts, reference)) / max(len(reference), 1)
+        results[cleaner] = {
+            "entries_per_cpu_second": entries / seconds,
+            "articles": len(texts),
+            "matches_bs4": matching
+        }
+    return results
+
+async def pool_throughput(feeds: List[bytes], workers: int, cleaner: str) -> Dict:
+    os.environ.update({"RSS_PARSE_WORKERS": str(workers), "RSS_HTML_CLEANER": cleaner})
+    pool = FeedParserPool()
+    try:
+        # Start the processes and import the parser before timing
+        await asyncio.gather(*(pool.parse(feeds[0], "bench") for _ in range(workers)))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(pool.parse(content, "bench") for content in feeds))
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.close()
+    return {
+        "workers": workers,
+        "seconds": elapsed,
+        "articles_per_second": sum(len(articles) for articles in results) / elapsed
+    }
+
+async def loop_lag(parse) -> Dict:
+    """Lateness of a 1 ms ticker while ``parse`` runs"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    await parse()
+    done.set()
+    await task
+    return {"max_lag_ms": max(lags) * 1000, **percentiles(lags)}
+
+async def run(args) -> Dict:
+    corpus = SyntheticFeedServer(feeds=args.feeds, items=args.items, words=args.words, seed=args.seed, rich_html=True)
+    feeds = list(corpus.feeds.values())
+    results = {"cleaners": cleaner_throughput(feeds)}
+
+    results["pool"] = [
+        await pool_throughput(feeds, workers, args.cleaner) for workers in range(1, args.max_workers + 1)
+    ]
+
+    async def inline():
+        # The old path: parse and clean on the event loop, one feed after another
+        for content in feeds:
+            parse_feed(content, "bench", "bs4")
+            await asyncio.sleep(0)
+
+    os.environ.update({"RSS_PARSE_WORKERS": str(args.max_workers), "RSS_HTML_CLEANER": args.cleaner})
+    pool = FeedParserPool()
+    await pool.parse(feeds[0], "bench")
+
+    async def pooled():
+        await asyncio.gather(*(pool.parse(content, "bench") for content in feeds))
+
+    try:
+        results["loop_lag"] = {"inline_bs4": await loop_lag(inline), "pool": await loop_lag(pooled)}
+    finally:
+        pool.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Feed parsing throughput per cleaner and worker count, and event-loop lag")
+    parser.add_argument("--feeds", type=int, default=200)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--cleaner", choices=CLEANERS, default="lxml", help="Cleaner used for the pool runs")
+    parser.add_argument("--max-workers", type=int, default=available_cpus())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""LLM gateway against a local stub OpenAI-compatible server with a slow tail.
+
+Sends ``--requests`` completions, ``--concurrency`` at a time, where a
+``--duplicate-ratio`` share repeat a popular prompt, first through the old
+path (the synchronous OpenAI client in ``asyncio.to_thread``) and then through
+LLMGateway. A ``--slow-ratio`` share of upstream requests take ``--slow-ms``
+and an ``--error-ratio`` share fail. For each path it reports latency
+percentiles, upstream requests made, failed answers, and for the gateway the
+coalesced, hedged and saturated calls. A final burst far above
+LLM_MAX_CONCURRENCY shows how quickly saturated calls fall back.
+
+Run from the backend directory:
+
+    python -m benchmarks.llm_gateway_benchmark --requests 400 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.pipeline_benchmark import percentiles
+from benchmarks.stub_servers import StubLLMServer
+
+def build_prompts(args) -> List[List[Dict[str, str]]]:
+    rng = random.Random(args.seed)
+    popular = [f"What happened with story {i} today?" for i in range(args.popular)]
+    prompts = []
+    for i in range(args.requests):
+        question = rng.choice(popular) if rng.random() < args.duplicate_ratio else f"Unique question {i}?"
+        prompts.append([{"role": "user", "content": question}])
+    return prompts
+
+def counter_value(metric, **labels) -> float:
+    return metric._values.get(metric._key(labels), 0.0)
+
+async def drive(call, prompts: List[List[Dict[str, str]]], concurrency: int) -> Dict:
+    """Run ``call`` over the prompts with bounded concurrency, timing each call"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(messages):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call(messages)
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(messages) for messages in prompts))
+    elapsed = time.perf_counter() - start
+    return {**percentiles(latencies), "failures": failures, "qps": len(prompts) / elapsed}
+
+async def run(args) -> Dict:
+    llm = StubLLMServer(
+        latency=args.latency_ms / 1000,
+        slow_ratio=args.slow_ratio,
+        slow_latency=args.slow_ms / 1000,
+        error_ratio=args.error_ratio,
+        seed=args.seed
+    ).start()
+    os.environ.update({
+        "LLM_MAX_CONCURRENCY": str(args.max_concurrency),
+        "LLM_HEDGE_DELAY": str(args.hedge_ms / 1000),
+        "LLM_TIMEOUT": str(args.timeout),
+        "LLM_QUEUE_TIMEOUT": str(args.queue_timeout)
+    })
+    try:
+        import openai
+
+        from services.llm_gateway import (
+            LLM_COALESCED, LLM_HEDGES, LLM_REJECTED, LLMGateway, LLMSaturated
+        )
+
+        prompts = build_prompts(args)
+        results = {}
+
+        client = openai.OpenAI(api_key="benchmark", base_url=llm.base_url, timeout=args.timeout)
+
+        async def direct(messages):
+            response = await asyncio.to_thread(
+                client.chat.completions.create, model="stub", messages=messages, max_tokens=500, temperature=0.3
+            )
+            return response.choices[0].message.content
+
+        requests_before = llm.requests
+        results["to_thread"] = await drive(direct, prompts, args.concurrency)
+        results["to_thread"]["upstream_requests"] = llm.requests - requests_before
+
+        gateway = LLMGateway("stub")
+        gateway.load("benchmark", llm.base_url)
+        requests_before = llm.requests
+        results["gateway"] = await drive(gateway.complete, prompts, args.concurrency)
+        results["gateway"].update({
+            "upstream_requests": llm.requests - requests_before,
+            "coalesced": counter_value(LLM_COALESCED),
+            "hedges_launched": counter_value(LLM_HEDGES, result="launched"),
+            "hedges_won": counter_value(LLM_HEDGES, result="won")
+        })
+
+        # Far more callers than slots: the overflow should fall back fast instead of queueing
+        burst = [[{"role": "user", "content": f"Burst question {i}?"}] for i in range(args.burst)]
+        saturated = []
+
+        async def timed_complete(messages):
+            start = time.perf_counter()
+            try:
+                await gateway.complete(messages)
+            except LLMSaturated:
+                saturated.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(timed_complete(messages) for messages in burst))
+        results["burst"] = {
+            "requests": args.burst,
+            "saturated": len(saturated),
+            "rejected_queue_full": counter_value(LLM_REJECTED, reason="queue_full"),
+            "rejected_queue_timeout": counter_value(LLM_REJECTED, reason="queue_timeout"),
+            "fallback_p50_ms": percentiles(saturated)["p50_ms"],
+            "elapsed_s": time.perf_counter() - start
+        }
+        await gateway.close()
+        return results
+    finally:
+        llm.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM gateway vs. the synchronous client against a stub LLM")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent callers")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3, help="Share of requests repeating a popular prompt")
+    parser.add_argument("--popular", type=int, default=5, help="Number of popular prompts")
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--slow-ratio", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=2000)
+    parser.add_argument("--error-ratio", type=float, default=0.02)
+    parser.add_argument("--max-concurrency", type=int, default=16, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--hedge-ms", type=float, default=300, help="LLM_HEDGE_DELAY in milliseconds")
+    parser.add_argument("--timeout", type=float, default=10, help="LLM_TIMEOUT")
+    parser.add_argument("--queue-timeout", type=float, default=0.5, help="LLM_QUEUE_TIMEOUT")
+    parser.add_argument("--burst", type=int, default=300, help="Simultaneous callers in the saturation burst")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""End-to-end rebuild throughput and /ask latency, fully offline.
+
+Serves a synthetic RSS corpus from a local HTTP stub and answers LLM calls
+with a deterministic OpenAI-compatible stub, then runs the real services:
+
+1. A full rebuild (fetch, dedup, split, embed, save) against an empty data
+   directory, then an incremental rebuild over the unchanged feeds.
+   Throughput is reported as articles/s and chunks/s. The stub answers the
+   incremental rebuild's conditional requests with 304s, and the run fails
+   unless every feed comes back ``not_modified``.
+2. Concurrent /ask requests through the FastAPI app. Latency percentiles,
+   QPS and the mean per-stage timings come from the responses.
+
+Peak RSS is sampled after each phase. By default a hashing embedder stands in
+for the sentence-transformers model so nothing has to be downloaded; pass
+``--embeddings model`` to benchmark the real model from the local Hugging Face
+cache.
+
+Results are written as JSON. When a baseline file is given, every latency,
+duration, memory and throughput metric is compared against it, and the exit
+status is 1 if any of them regressed by more than ``--tolerance``.
+
+Run from the backend directory:
+
+    python -m benchmarks.pipeline_benchmark --output results.json
+    python -m benchmarks.pipeline_benchmark --baseline results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+# The services are imported after moving into a scratch data directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.stub_servers import StubLLMServer, SyntheticFeedServer
+from services.dedup_service import DedupService
+from services.rss_service import FEED_FETCHES
+
+class HashingEmbeddings:
+    """Deterministic bag-of-words embeddings, hashed into ``dim`` signed buckets and L2-normalized"""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            hashes = np.array([zlib.crc32(word.encode("utf-8")) for word in text.lower().split()], dtype=np.int64)
+            if len(hashes):
+                signs = np.where(hashes & (1 << 31), -1.0, 1.0)
+                vectors[i] = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.maximum(norms, 1e-12)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (Linux reports KB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    return {
+        f"p{p}_ms": float(np.percentile(latencies, p) * 1000) if latencies else 0.0
+        for p in (50, 90, 95, 99)
+    }
+
+def feed_fetches(result: str) -> float:
+    """Feed fetches with this outcome so far, over all feeds"""
+    index = FEED_FETCHES.labels.index("result")
+    return sum(value for key, value in FEED_FETCHES._values.items() if key[index] == result)
+
+async def run_rebuild(main, incremental: bool) -> Dict[str, float]:
+    """Fetch, deduplicate and rebuild the way the ingest worker does, timing each part"""
+    start = time.perf_counter()
+    not_modified = feed_fetches("not_modified")
+    articles = await main.rss_service.fetch_all_articles()
+    fetch_s = time.perf_counter() - start
+    not_modified = feed_fetches("not_modified") - not_modified
+    fetched = len(articles)
+
+    articles, dedup_stats = await asyncio.to_thread(DedupService().deduplicate, articles)
+    index_start = time.perf_counter()
+    result = await main.rag_service.rebuild_index(articles, incremental=incremental)
+    index_s = time.perf_counter() - index_start
+    seconds = time.perf_counter() - start
+
+    return {
+        "seconds": seconds,
+        "fetch_seconds": fetch_s,
+        "index_seconds": index_s,
+        "articles": fetched,
+        "feeds_not_modified": not_modified,
+        "duplicates": dedup_stats["duplicates"],
+        "chunks": result["chunks"],
+        "chunks_embedded": result["added"],
+        "articles_per_s": fetched / seconds,
+        "chunks_per_s": result["added"] / seconds,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+async def run_ask_load(main, questions: List[str], concurrency: int, warmup: int) -> Dict[str, float]:
+    """Fire questions at POST /ask with ``concurrency`` requests in flight"""
+    import httpx
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=300) as client:
+        for question in questions[:warmup]:
+            await client.post("/ask", json={"question": question})
+
+        latencies = []
+        stage_totals = defaultdict(float)
+        errors = 0
+        pending = iter(questions[warmup:])
+
+        async def worker():
+            nonlocal errors
+            for question in pending:
+                start = time.perf_counter()
+                response = await client.post("/ask", json={"question": question})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                for stage, seconds in (response.json().get("timings") or {}).items():
+                    stage_totals[stage] += seconds
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "qps": len(latencies) / wall,
+        **percentiles(latencies),
+        "stages_mean_ms": {stage: total / max(len(latencies), 1) * 1000 for stage, total in sorted(stage_totals.items())},
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def make_questions(corpus: SyntheticFeedServer, count: int, seed: int) -> List[str]:
+    """Questions built from words of random corpus articles"""
+    rng = np.random.default_rng(seed)
+    questions = []
+    for _ in range(count):
+        words = corpus.articles[rng.integers(len(corpus.articles))]["content"].split()
+        picked = [words[i] for i in rng.integers(len(words), size=3)]
+        questions.append(f"What is the latest on {picked[0]}, {picked[1]} and {picked[2]}?")
+    return questions
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = float(value)
+    return flat
+
+def direction(metric: str) -> int:
+    """+1 if higher is better, -1 if lower is better, 0 if the metric is informational"""
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith("_per_s") or name == "qps":
+        return 1
+    if name.endswith("_ms") or name.endswith("seconds") or name.endswith("_mb"):
+        return -1
+    return 0
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print the change of every comparable metric and return the regressed ones"""
+    current, previous = flatten(results), flatten(baseline)
+    regressions = []
+    print(f"\n{'metric':<48} {'baseline':>12} {'current':>12} {'change':>9}")
+    for metric in sorted(current.keys() & previous.keys()):
+        better = direction(metric)
+        if better == 0 or previous[metric] == 0:
+            continue
+        change = (current[metric] - previous[metric]) / previous[metric]
+        regressed = change * better < -tolerance
+        if regressed:
+            regressions.append(metric)
+        print(f"{metric:<48} {previous[metric]:>12.3f} {current[metric]:>12.3f} {change:>+8.1%}{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+async def run(args) -> Dict:
+    corpus = SyntheticFeedServer(
+        feeds=args.feeds,
+        items=args.items,
+        words=args.words,
+        duplicate_ratio=args.duplicate_ratio,
+        seed=args.seed
+    ).start()
+    llm = StubLLMServer(latency=args.llm_latency_ms / 1000).start()
+    data_dir = tempfile.mkdtemp(prefix="pipeline-benchmark-")
+
+    os.environ.update({
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": llm.base_url,
+        "RSS_HOST_DELAY": "0",
+        "RSS_PER_HOST_CONCURRENCY": str(args.fetch_concurrency),
+        "RSS_MAX_CONCURRENCY": str(args.fetch_concurrency),
+        "INDEX_REFRESH_INTERVAL": "3600"
+    })
+    if not args.with_cache:
+        os.environ["ANSWER_CACHE_SIZE"] = "0"
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+    try:
+        import main
+
+        if args.embeddings == "hash":
+            main.rag_service._create_embeddings = HashingEmbeddings
+        await main.rag_service.initialize()
+        main.rss_service.rss_sources = corpus.feed_urls
+
+        results = {
+            "full_rebuild": await run_rebuild(main, incremental=False),
+            "incremental_rebuild": await run_rebuild(main, incremental=True),
+            "ask": await run_ask_load(
+                main,
+                make_questions(corpus, args.warmup + args.requests, args.seed),
+                args.concurrency,
+                args.warmup
+            )
+        }
+        await main.rss_service.close()
+
+        # Unchanged feeds must be answered from the feed cache on a 304
+        not_modified = results["incremental_rebuild"]["feeds_not_modified"]
+        if not_modified != args.feeds:
+            raise RuntimeError(f"Only {not_modified:.0f} of {args.feeds} unchanged feeds came back not_modified")
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(data_dir, ignore_errors=True)
+        corpus.stop()
+        llm.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feeds", type=int, default=50)
+    parser.add_argument("--items", type=int, default=20, help="Articles per feed (the service reads at most 20)")
+    parser.add_argument("--words", type=int, default=300, help="Words per article")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+    parser.add_argument("--embeddings", choices=("hash", "model"), default="hash")
+    parser.add_argument("--fetch-concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--with-cache", action="store_true", help="Keep the answer cache on during the /ask load")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results previously written with --output")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression per metric")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    for phase in ("full_rebuild", "incremental_rebuild"):
+        r = results[phase]
+        print(
+            f"{phase:<20} {r['seconds']:.2f}s articles={r['articles']} ({r['articles_per_s']:.0f}/s) "
+            f"embedded={r['chunks_embedded']} ({r['chunks_per_s']:.0f} chunks/s) "
+            f"not_modified={r['feeds_not_modified']:.0f} peak_rss={r['peak_rss_mb']:.0f}MB"
+        )
+    ask = results["ask"]
+    print(
+        f"{'ask':<20} {ask['requests']} requests x{ask['concurrency']} qps={ask['qps']:.1f} "
+        f"p50={ask['p50_ms']:.1f}ms p95={ask['p95_ms']:.1f}ms p99={ask['p99_ms']:.1f}ms errors={ask['errors']}"
+    )
+    print("  stages: " + " ".join(f"{stage}={ms:.2f}ms" for stage, ms in ask["stages_mean_ms"].items()))
+
+    report = {
+        "config": vars(args),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Adaptive feed polling against feeds with different publishing rates, on a fake clock.
+
+Serves feeds from a local stub that publish one article every ``--periods``
+seconds each, and drives FeedScheduler with a fake clock over ``--hours`` of
+simulated time. New articles are upserted into a real (hash-embedded) index
+the way the ingest worker does. Per feed it reports polls made, articles
+published and found, how long after publication they were found, and the
+final polling interval, next to the number of polls a fixed interval of
+SCHEDULER_MIN_INTERVAL would have made.
+
+Run from the backend directory:
+
+    python -m benchmarks.scheduler_simulation --hours 24
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.pipeline_benchmark import HashingEmbeddings
+from benchmarks.stub_servers import PublishingFeedServer
+
+class FakeClock:
+    """Wall-clock seconds that only move when advanced"""
+
+    def __init__(self, start: float):
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+async def simulate(args) -> dict:
+    clock = FakeClock(time.time())
+    server = PublishingFeedServer(args.periods, clock.time, words=args.words, seed=args.seed).start()
+    data_dir = tempfile.mkdtemp(prefix="scheduler-simulation-")
+    os.environ.update({"RSS_HOST_DELAY": "0", "INDEX_REFRESH_INTERVAL": "3600"})
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+    try:
+        from services.dedup_service import DedupService
+        from services.feed_scheduler import FeedScheduler
+        from services.rag_service import RAGService
+        from services.rss_service import RSSService
+
+        rag_service = RAGService()
+        rag_service._create_embeddings = HashingEmbeddings
+        await rag_service.initialize()
+        rss_service = RSSService()
+        rss_service.rss_sources = server.feed_urls
+        scheduler = FeedScheduler(rss_service, clock=clock.time)
+        dedup_service = DedupService()
+
+        end = clock.time() + args.hours * 3600
+        polls = defaultdict(int)
+        delays = defaultdict(list)
+        seen = set()
+        chunks_added = 0
+        upsert_seconds = 0.0
+        while clock.time() < end:
+            scheduler.sync_feeds()
+            for url, state in scheduler.feeds.items():
+                if state.next_poll <= clock.time():
+                    polls[url] += 1
+            articles = await scheduler.poll_due()
+
+            for article in articles:
+                feed, item = (int(part) for part in article["url"].rsplit("/", 2)[-2:])
+                if (feed, item) not in seen:
+                    seen.add((feed, item))
+                    delays[feed].append(clock.time() - server.published_at(feed, item))
+            if articles:
+                start = time.perf_counter()
+                articles, _ = dedup_service.deduplicate(articles)
+                result = await rag_service.rebuild_index(articles, incremental=True)
+                upsert_seconds += time.perf_counter() - start
+                chunks_added += result["added"]
+            clock.advance(args.tick)
+
+        await rss_service.close()
+        fixed_polls = int(args.hours * 3600 // scheduler.min_interval) + 1
+        feeds = []
+        for n, url in enumerate(server.feed_urls):
+            state = scheduler.feeds[url]
+            published = server.latest_item(n) + 1
+            feeds.append({
+                "period_s": args.periods[n],
+                "polls": polls[url],
+                "fixed_interval_polls": fixed_polls,
+                "published": published,
+                "found": len(delays[n]),
+                "mean_delay_s": float(np.mean(delays[n])) if delays[n] else 0.0,
+                "p95_delay_s": float(np.percentile(delays[n], 95)) if delays[n] else 0.0,
+                "final_interval_s": state.interval
+            })
+        return {
+            "feeds": feeds,
+            "polls": sum(polls.values()),
+            "fixed_interval_polls": fixed_polls * len(args.periods),
+            "chunks_added": chunks_added,
+            "upsert_seconds": upsert_seconds,
+            "index_chunks": len(rag_service.vectorstore) if rag_service.vectorstore else 0
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(data_dir, ignore_errors=True)
+        server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--periods", type=float, nargs="+", default=[300, 900, 1800, 3600, 7200, 21600],
+                        help="Seconds between new articles, one value per feed")
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--tick", type=float, default=30, help="Fake clock step in seconds")
+    parser.add_argument("--words", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(simulate(args))
+
+    print(f"{'period':>8} {'polls':>6} {'fixed':>6} {'published':>10} {'found':>6} {'mean delay':>11} {'p95 delay':>10} {'interval':>9}")
+    for feed in results["feeds"]:
+        print(
+            f"{feed['period_s']:>7.0f}s {feed['polls']:>6} {feed['fixed_interval_polls']:>6} {feed['published']:>10} "
+            f"{feed['found']:>6} {feed['mean_delay_s']:>10.0f}s {feed['p95_delay_s']:>9.0f}s {feed['final_interval_s']:>8.0f}s"
+        )
+    print(
+        f"\n{results['polls']} polls vs {results['fixed_interval_polls']} at a fixed interval; "
+        f"{results['chunks_added']} chunks embedded in {results['upsert_seconds']:.1f}s of upserts, "
+        f"{results['index_chunks']} chunks indexed"
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Local stand-ins for the network services the pipeline talks to.
+
+SyntheticFeedServer serves a deterministic RSS corpus, PublishingFeedServer
+serves feeds that grow over (possibly fake) time, and StubLLMServer answers
+OpenAI chat completion requests (plain and streamed) with a deterministic
+answer after a delay, optionally with a slow tail and injected errors. All of
+them run on 127.0.0.1 in a background thread, so benchmarks need no network
+access.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+class _StubServer:
+    """ThreadingHTTPServer on a free local port, serving until stopped"""
+
+    def __init__(self, handler):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+class SyntheticFeedServer(_StubServer):
+    """Serves ``feeds`` RSS feeds of ``items`` articles each at /feed/<n>.xml
+
+    Article text is drawn from a Zipf-distributed vocabulary with a fixed seed,
+    and ``duplicate_ratio`` of the articles are copies of a shared wire story
+    with a different outlet's byline, so near-duplicate detection has work to do.
+    Publication times are spread over the last ``days`` days. With ``rich_html``
+    descriptions are marked up like real feed items (paragraphs, links,
+    emphasis, a captioned image) instead of a single paragraph. Every feed has an
+    ETag and Last-Modified, and conditional requests that match get a 304.
+    """
+
+    def __init__(self, feeds: int = 50, items: int = 20, words: int = 300, duplicate_ratio: float = 0.1,
+                 days: int = 7, vocab: int = 20000, seed: int = 0, rich_html: bool = False):
+        rng = np.random.default_rng(seed)
+        terms = [f"term{i}" for i in range(vocab)]
+        now = datetime.now(timezone.utc)
+
+        def paragraph(length: int) -> str:
+            ids = np.minimum(rng.zipf(1.3, size=length), vocab) - 1
+            return " ".join(terms[i] for i in ids)
+
+        def markup(body: str) -> str:
+            if not rich_html:
+                return f"<p>{body}</p>"
+            tokens = body.split(" ")
+            paragraphs = []
+            for start in range(0, len(tokens), 40):
+                chunk = tokens[start:start + 40]
+                chunk[len(chunk) // 2] = f'<a href="http://example.com/{start}">{chunk[len(chunk) // 2]}</a>'
+                chunk[0] = f"<em>{chunk[0]}</em>"
+                paragraphs.append(f'<p class="body">{" ".join(chunk)}</p>')
+            figure = '<figure><img src="http://example.com/a.jpg" alt=""/><figcaption>Photo &amp; credit</figcaption></figure>'
+            return f'<div class="article">{figure}{"".join(paragraphs)}</div>'
+
+        wire_stories = [paragraph(words) for _ in range(max(1, int(feeds * items * duplicate_ratio / 3)))]
+
+        self.feeds: Dict[str, bytes] = {}
+        self.articles: List[Dict[str, str]] = []
+        for feed in range(feeds):
+            entries = []
+            for item in range(items):
+                if rng.random() < duplicate_ratio:
+                    story = wire_stories[rng.integers(len(wire_stories))]
+                    body = f"Outlet {feed} reports. {story}"
+                else:
+                    body = paragraph(words)
+                title = f"Feed {feed} story {item} {terms[rng.integers(vocab)]}"
+                published = now - timedelta(seconds=int(rng.integers(days * 86400)))
+                self.articles.append({"title": title, "content": body})
+                entries.append(
+                    f"<item><title>{escape(title)}</title>"
+                    f"<link>http://feeds.example/{feed}/{item}</link>"
+                    f"<pubDate>{format_datetime(published)}</pubDate>"
+                    f"<description>{escape(markup(body))}</description></item>"
+                )
+            self.feeds[f"/feed/{feed}.xml"] = (
+                f'<?xml version="1.0"?><rss version="2.0"><channel><title>Feed {feed}</title>'
+                f'{"".join(entries)}</channel></rss>'
+            ).encode("utf-8")
+
+        feeds_by_path = self.feeds
+        etags = {path: f'"{hashlib.sha1(body).hexdigest()}"' for path, body in self.feeds.items()}
+        modified = now.replace(microsecond=0)
+        last_modified = format_datetime(modified, usegmt=True)
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                body = feeds_by_path.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if self._not_modified(etags[self.path]):
+                    self.send_response(304)
+                    self._send_validators(etags[self.path])
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self._send_validators(etags[self.path])
+                self.send_header("Content-Type", "application/rss+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _not_modified(self, etag: str) -> bool:
+                """If-None-Match wins over If-Modified-Since, as in RFC 9110"""
+                if_none_match = self.headers.get("If-None-Match")
+                if if_none_match is not None:
+                    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+                if_modified_since = self.headers.get("If-Modified-Since")
+                if if_modified_since is None:
+                    return False
+                try:
+                    return modified <= parsedate_to_datetime(if_modified_since)
+                except (TypeError, ValueError):
+                    return False
+
+            def _send_validators(self, etag: str):
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+
+            def log_message(self, *args):
+                pass
+
+        super().__init__(Handler)
+
+    @property
+    def feed_urls(self) -> List[str]:
+        return [self.url + path for path in self.feeds]
+
+class PublishingFeedServer(_StubServer):
+    """Serves feeds that publish a new article every ``periods[n]`` seconds of ``clock`` time
+
+    Feed n lists its latest ``items`` articles as of the current clock, so a
+    fake clock decides what each poll finds. ``published_at(n, k)`` is when
+    article k of feed n appeared, for measuring how long a poller took to
+    notice it.
+    """
+
+    def __init__(self, periods: List[float], clock, items: int = 20, words: int = 200,
+                 vocab: int = 20000, seed: int = 0):
+        terms = [f"term{i}" for i in range(vocab)]
+        self.periods = periods
+        self.clock = clock
+        self.start_time = clock()
+        self._bodies: Dict[tuple, str] = {}
+
+        def body(feed: int, item: int) -> str:
+            key = (feed, item)
+            if key not in self._bodies:
+                rng = np.random.default_rng([seed, feed, item])
+                ids = np.minimum(rng.zipf(1.3, size=words), vocab) - 1
+                self._bodies[key] = " ".join(terms[i] for i in ids)
+            return self._bodies[key]
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                feed = int(self.path.rsplit("/", 1)[-1].split(".")[0]) if self.path.startswith("/feed/") else -1
+                if not 0 <= feed < len(periods):
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                latest = server.latest_item(feed)
+                entries = []
+                for item in range(latest, max(latest - items, -1), -1):
+                    published = datetime.fromtimestamp(server.published_at(feed, item), tz=timezone.utc)
+                    entries.append(
+                        f"<item><title>Feed {feed} story {item}</title>"
+                        f"<link>http://feeds.example/{feed}/{item}</link>"
+                        f"<pubDate>{format_datetime(published)}</pubDate>"
+                        f"<description>{escape('<p>' + body(feed, item) + '</p>')}</description></item>"
+                    )
+                payload = (
+                    f'<?xml version="1.0"?><rss version="2.0"><channel><title>Feed {feed}</title>'
+                    f'{"".join(entries)}</channel></rss>'
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        super().__init__(Handler)
+
+    def latest_item(self, feed: int) -> int:
+        """Index of the newest article feed ``feed`` lists at the current clock time"""
+        return int((self.clock() - self.start_time) // self.periods[feed])
+
+    def published_at(self, feed: int, item: int) -> float:
+        return self.start_time + item * self.periods[feed]
+
+    @property
+    def feed_urls(self) -> List[str]:
+        return [f"{self.url}/feed/{feed}.xml" for feed in range(len(self.periods))]
+
+class StubLLMServer(_StubServer):
+    """OpenAI-compatible /v1/chat/completions that answers after ``latency`` seconds
+
+    The answer is derived from a hash of the request messages, so the same
+    prompt always gets the same answer. Streamed responses send one word per
+    chunk. A ``slow_ratio`` share of requests take ``slow_latency`` instead, and
+    an ``error_ratio`` share fail with ``error_status``, drawn from a seeded
+    generator; the first ``slow_requests`` requests are always slow.
+    ``requests`` counts the completion requests received.
+    """
+
+    def __init__(self, latency: float = 0.05, answer_words: int = 60, slow_ratio: float = 0.0,
+                 slow_latency: float = 1.0, error_ratio: float = 0.0, error_status: int = 500,
+                 slow_requests: int = 0, seed: int = 0):
+        self.requests = 0
+        lock = threading.Lock()
+        rng = random.Random(seed)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                try:
+                    self._respond()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on this request (a timeout or a cancelled hedge)
+                    self.close_connection = True
+
+            def _respond(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with lock:
+                    server.requests += 1
+                    slow = rng.random() < slow_ratio or server.requests <= slow_requests
+                    failed = rng.random() < error_ratio
+                time.sleep(slow_latency if slow else latency)
+
+                if failed:
+                    body = json.dumps({"error": {"message": "stub failure", "type": "server_error"}}).encode("utf-8")
+                    self.send_response(error_status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                digest = hashlib.sha256(json.dumps(request.get("messages"), sort_keys=True).encode("utf-8")).hexdigest()
+                words = [f"{digest[i % 60:i % 60 + 4]} " for i in range(answer_words)]
+
+                if request.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for word in words:
+                        self._chunk(f"data: {json.dumps(self._delta(word))}\n\n".encode("utf-8"))
+                    self._chunk(b"data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                    return
+
+                body = json.dumps({
+                    "id": "stub",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": request.get("model", "stub"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(words)}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": answer_words, "total_tokens": answer_words}
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _delta(self, word: str) -> dict:
+                return {
+                    "id": "stub",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": "stub",
+                    "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]
+                }
+
+            def _chunk(self, data: bytes):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        super().__init__(Handler)
+
+    @property
+    def base_url(self) -> str:
+        return self.url + "/v1"
@@ -1,15 +1,22 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 import asyncio
+import json
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 import os
+import subprocess
+import sys
+import time
 from dotenv import load_dotenv
 
 from services.rag_service import RAGService
 from services.rss_service import RSSService
+from services.job_store import ACTIVE_STATUSES, FINISHED_STATUSES, JobConflict, JobStore
+from services.metrics import registry
 from models.schemas import QuestionRequest, QuestionResponse, RebuildResponse, SourcesResponse
 
 # Load environment variables
@@ -35,30 +42,146 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route and status",
+    ["method", "route", "status"]
+)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time every request, labelled by route template rather than raw path"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route.path if route else "unmatched",
+        status=str(response.status_code)
+    )
+    return response
+
 # Initialize services
 rag_service = RAGService()
 rss_service = RSSService()
+job_store = JobStore()
+job_events_poll_interval = float(os.getenv("JOB_EVENTS_POLL_INTERVAL", "0.5"))
 
-# Global state for rebuild progress
-rebuild_status = {"in_progress": False, "progress": 0, "message": ""}
+# Rebuilds run in a separate ingest worker process (worker.py); "spawn" starts
+# one alongside this API process, "external" expects it to be run separately
+ingest_worker_mode = os.getenv("INGEST_WORKER", "spawn").lower()
+ingest_worker: Optional[subprocess.Popen] = None
+ingest_worker_check_interval = float(os.getenv("INGEST_WORKER_CHECK_INTERVAL", "5"))
+ingest_worker_max_restart_delay = float(os.getenv("INGEST_WORKER_MAX_RESTART_DELAY", "60"))
+ingest_supervisor_task: Optional[asyncio.Task] = None
+
+# Background model and index loading, kept referenced until it finishes
+initialize_task: Optional[asyncio.Task] = None
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize services on startup"""
-    try:
-        await rag_service.initialize()
-        logger.info("RAG service initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize RAG service: {e}")
+    """Start loading the model and index in the background so the worker serves right away"""
+    global initialize_task, ingest_worker, ingest_supervisor_task
+    initialize_task = asyncio.create_task(rag_service.initialize())
+    
+    if ingest_worker_mode == "spawn":
+        ingest_worker = start_ingest_worker()
+        ingest_supervisor_task = asyncio.create_task(supervise_ingest_worker())
+
+def start_ingest_worker() -> subprocess.Popen:
+    """Spawn an ingest worker; extra workers spawned by other API processes wait on the ingest lock"""
+    worker = subprocess.Popen([
+        sys.executable,
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py"),
+        "--parent",
+        str(os.getpid())
+    ])
+    logger.info(f"Started ingest worker (pid {worker.pid})")
+    return worker
+
+async def supervise_ingest_worker():
+    """Restart the spawned ingest worker whenever it exits, backing off while it keeps crashing
+
+    The new worker requeues the job its predecessor was running once it takes
+    the ingest lock, so queued and interrupted rebuilds are not stranded.
+    """
+    global ingest_worker
+    delay = min(1.0, ingest_worker_max_restart_delay)
+    started = time.monotonic()
+    while True:
+        await asyncio.sleep(ingest_worker_check_interval)
+        code = ingest_worker.poll()
+        if code is None:
+            continue
+        
+        # A worker that stayed up for a while gets a fresh backoff
+        if time.monotonic() - started > ingest_worker_max_restart_delay:
+            delay = min(1.0, ingest_worker_max_restart_delay)
+        logger.warning(f"Ingest worker (pid {ingest_worker.pid}) exited with code {code}, restarting in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, ingest_worker_max_restart_delay)
+        ingest_worker = start_ingest_worker()
+        started = time.monotonic()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled connections and stop the ingest worker on shutdown"""
+    await rss_service.close()
+    await rag_service.llm_gateway.close()
+    
+    if ingest_supervisor_task is not None:
+        ingest_supervisor_task.cancel()
+    if ingest_worker is not None and ingest_worker.poll() is None:
+        ingest_worker.terminate()
+        try:
+            await asyncio.to_thread(ingest_worker.wait, 10)
+        except subprocess.TimeoutExpired:
+            ingest_worker.kill()
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "ok", "timestamp": datetime.now().isoformat()}
+    return {"status": "ok", "rag": rag_service.status, "timestamp": datetime.now().isoformat()}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness of the RAG service: 200 once ready, 503 while loading or degraded"""
+    readiness = rag_service.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["status"] == "ready" else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Counters and latency histograms in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def check_loaded():
+    """Turn requests away while the model and index are still loading"""
+    if rag_service.status == "loading":
+        raise HTTPException(
+            status_code=503,
+            detail="RAG service is still loading",
+            headers={"Retry-After": "5"}
+        )
+
+def check_time_range(request: QuestionRequest):
+    """Reject time ranges that end before they start"""
+    after, before = request.published_after, request.published_before
+    if after and before:
+        # Compare naive datetimes as UTC, like the RAG service does
+        if after.tzinfo is None:
+            after = after.replace(tzinfo=timezone.utc)
+        if before.tzinfo is None:
+            before = before.replace(tzinfo=timezone.utc)
+        if after > before:
+            raise HTTPException(status_code=400, detail="published_after must not be later than published_before")
 
 @app.post("/ask", response_model=QuestionResponse)
 async def ask_question(request: QuestionRequest):
     """Process a question using RAG"""
+    check_time_range(request)
+    check_loaded()
+    
     try:
         if not request.question.strip():
             raise HTTPException(status_code=400, detail="Question cannot be empty")
@@ -66,18 +189,49 @@ async def ask_question(request: QuestionRequest):
         logger.info(f"Processing question: {request.question[:100]}...")
         
         # Get answer from RAG service
-        result = await rag_service.ask_question(request.question)
+        result = await rag_service.ask_question(
+            request.question,
+            published_after=request.published_after,
+            published_before=request.published_before
+        )
         
         return QuestionResponse(
             answer=result["answer"],
             citations=result["citations"],
-            processing_time=result.get("processing_time", 0)
+            processing_time=result.get("processing_time", 0),
+            cache=result.get("cache"),
+            timings=result.get("timings"),
+            context=result.get("context")
         )
         
     except Exception as e:
         logger.error(f"Error processing question: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/ask/stream")
+async def ask_question_stream(request: QuestionRequest):
+    """Process a question using RAG, streaming citations and answer tokens as server-sent events"""
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    check_time_range(request)
+    check_loaded()
+    
+    logger.info(f"Streaming question: {request.question[:100]}...")
+    
+    async def event_stream():
+        async for event in rag_service.stream_question(
+            request.question,
+            published_after=request.published_after,
+            published_before=request.published_before
+        ):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/ingest/sources", response_model=SourcesResponse)
 async def get_sources():
     """Get list of RSS sources"""
@@ -89,65 +243,82 @@ async def get_sources():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/ingest/rebuild", response_model=RebuildResponse)
-async def rebuild_index(background_tasks: BackgroundTasks):
-    """Rebuild the vector index from RSS sources"""
-    global rebuild_status
-    
-    if rebuild_status["in_progress"]:
-        raise HTTPException(status_code=409, detail="Rebuild already in progress")
+async def rebuild_index(mode: str = "incremental"):
+    """Queue an index rebuild for the ingest worker"""
+    if mode not in ("incremental", "full"):
+        raise HTTPException(status_code=400, detail="Mode must be 'incremental' or 'full'")
     
     try:
-        # Start rebuild in background
-        background_tasks.add_task(perform_rebuild)
-        rebuild_status["in_progress"] = True
-        rebuild_status["progress"] = 0
-        rebuild_status["message"] = "Starting rebuild..."
-        
-        return RebuildResponse(
-            status="started",
-            message="Index rebuild started in background"
-        )
-        
+        job = await asyncio.to_thread(job_store.enqueue, "rebuild", {"incremental": mode == "incremental"})
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail=f"Rebuild already in progress (job {e.job['id']})")
     except Exception as e:
-        logger.error(f"Error starting rebuild: {e}")
-        rebuild_status["in_progress"] = False
+        logger.error(f"Error queueing rebuild: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    
+    return RebuildResponse(
+        status="queued",
+        message=f"Index rebuild ({mode}) queued",
+        job_id=job["id"]
+    )
 
 @app.get("/ingest/rebuild/status")
 async def get_rebuild_status():
-    """Get current rebuild status"""
-    return rebuild_status
+    """Get the status of the latest rebuild"""
+    job = await asyncio.to_thread(job_store.latest, "rebuild")
+    if job is None:
+        return {"in_progress": False, "progress": 0, "message": ""}
+    
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "in_progress": job["status"] in ACTIVE_STATUSES,
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "message": job["message"],
+        **(job["result"] or {})
+    }
 
-async def perform_rebuild():
-    """Perform the actual index rebuild"""
-    global rebuild_status
+@app.get("/ingest/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get an ingest job, including its result once finished"""
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/ingest/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """Stream an ingest job's progress as server-sent events until it finishes
+
+    Reconnecting clients resume after the Last-Event-ID they received.
+    """
+    if await asyncio.to_thread(job_store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    last_event_id = request.headers.get("last-event-id", "0")
+    after = int(last_event_id) if last_event_id.isdigit() else 0
     
-    try:
-        rebuild_status["message"] = "Fetching RSS feeds..."
-        rebuild_status["progress"] = 10
-        
-        # Fetch articles from RSS feeds
-        articles = await rss_service.fetch_all_articles()
-        rebuild_status["progress"] = 40
-        rebuild_status["message"] = f"Processing {len(articles)} articles..."
-        
-        # Rebuild the RAG index
-        result = await rag_service.rebuild_index(articles)
-        rebuild_status["progress"] = 90
-        
-        rebuild_status["progress"] = 100
-        rebuild_status["message"] = "Rebuild completed successfully"
-        rebuild_status["articles"] = result["articles"]
-        rebuild_status["chunks"] = result["chunks"]
-        
-        # Reset status after a delay
-        await asyncio.sleep(5)
-        rebuild_status["in_progress"] = False
-        
-    except Exception as e:
-        logger.error(f"Error during rebuild: {e}")
-        rebuild_status["in_progress"] = False
-        rebuild_status["message"] = f"Rebuild failed: {str(e)}"
+    async def event_stream():
+        nonlocal after
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            for event in await asyncio.to_thread(job_store.events, job_id, after):
+                after = event["id"]
+                yield f"id: {event['id']}\nevent: {event['status']}\ndata: {json.dumps(event)}\n\n"
+                if event["status"] in FINISHED_STATUSES:
+                    return
+                last_sent = time.monotonic()
+            if time.monotonic() - last_sent > 15:
+                # Keep idle proxies from closing the connection
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            await asyncio.sleep(job_events_poll_interval)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 if __name__ == "__main__":
     import uvicorn
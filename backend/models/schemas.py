@@ -1,9 +1,17 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class QuestionRequest(BaseModel):
     question: str
+    # Only use articles published in this range; naive datetimes are UTC
+    published_after: Optional[datetime] = None
+    published_before: Optional[datetime] = None
+
+class AlternateSource(BaseModel):
+    title: str
+    url: str
+    source: Optional[str] = None
 
 class Citation(BaseModel):
     id: str
@@ -12,11 +20,28 @@ class Citation(BaseModel):
     snippet: str
     timestamp: str
     source: Optional[str] = None
+    alternate_sources: Optional[List[AlternateSource]] = None
+
+class CacheInfo(BaseModel):
+    hit: Optional[str] = None
+    hit_ratio: float
+    saved_time: float
+    total_saved_time: float
+
+class ContextInfo(BaseModel):
+    tokens: int
+    original_tokens: int
+    tokens_saved: int
 
 class QuestionResponse(BaseModel):
     answer: str
     citations: List[Citation]
     processing_time: Optional[float] = None
+    cache: Optional[CacheInfo] = None
+    # Seconds spent per stage (cache lookups, queue wait, embed, search, context, llm, total)
+    timings: Optional[Dict[str, float]] = None
+    # Prompt context size after merging, dedup and the token budget
+    context: Optional[ContextInfo] = None
 
 class SourcesResponse(BaseModel):
     rss: List[str]
@@ -24,5 +49,13 @@ class SourcesResponse(BaseModel):
 class RebuildResponse(BaseModel):
     status: str
     message: str
+    job_id: Optional[str] = None
     articles: Optional[int] = None
     chunks: Optional[int] = None
+    added: Optional[int] = None
+    removed: Optional[int] = None
+    unchanged: Optional[int] = None
+    duplicates: Optional[int] = None
+    dedup_ratio: Optional[float] = None
+    expired: Optional[int] = None
+    partitions: Optional[int] = None
@@ -0,0 +1,125 @@
+import re
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class AnswerCache:
+    """Two-layer answer cache: exact match on normalized question text, then
+    a semantic match on the query embedding. Entries are evicted LRU and by TTL."""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 900.0, similarity_threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+
+        # Bumped on every clear so answers computed against an old index are dropped
+        self.generation = 0
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.saved_time = 0.0
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        """Normalize question text for the exact-match layer"""
+        question = re.sub(r"[^\w\s]", " ", question.lower())
+        return re.sub(r"\s+", " ", question).strip()
+
+    def get_exact(self, question: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached answer by normalized question text"""
+        key = self.normalize(question)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry):
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        self.exact_hits += 1
+        self.saved_time += entry["cost"]
+        return entry
+
+    def get_semantic(self, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Look up a cached answer whose query embedding is close enough"""
+        if not self._entries:
+            self.misses += 1
+            return None
+
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries.keys())
+            self._matrix = np.stack([self._entries[k]["embedding"] for k in self._matrix_keys])
+
+        query = self._unit(embedding)
+        scores = self._matrix @ query
+        for i in np.argsort(-scores):
+            if scores[i] < self.similarity_threshold:
+                break
+            key = self._matrix_keys[i]
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry):
+                continue
+
+            self._entries.move_to_end(key)
+            self.semantic_hits += 1
+            self.saved_time += entry["cost"]
+            return entry
+
+        self.misses += 1
+        return None
+
+    def put(self, question: str, embedding: List[float], result: Dict[str, Any],
+            cost: float, generation: int):
+        """Cache an answer unless the index changed while it was being computed"""
+        if generation != self.generation:
+            return
+
+        key = self.normalize(question)
+        self._entries[key] = {
+            "result": result,
+            "embedding": self._unit(embedding),
+            "cost": cost,
+            "created": time.monotonic()
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._matrix = None
+
+    def clear(self):
+        """Drop every cached answer, e.g. after the vectorstore was rebuilt"""
+        self._entries.clear()
+        self._matrix = None
+        self.generation += 1
+        logger.info("Answer cache invalidated")
+
+    def stats(self) -> Dict[str, float]:
+        """Hit ratio and accumulated saved latency"""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "hit_ratio": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "total_saved_time": self.saved_time
+        }
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return time.monotonic() - entry["created"] > self.ttl
+
+    def _remove(self, key: str):
+        self._entries.pop(key, None)
+        self._matrix = None
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,149 @@
+import os
+import re
+import json
+import logging
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BM25_META_FILE = "bm25_meta.json"
+BM25_VOCAB_FILE = "bm25_vocab.txt"
+BM25_OFFSETS_FILE = "bm25_offsets.npy"
+BM25_ROWS_FILE = "bm25_rows.npy"
+BM25_IMPACTS_FILE = "bm25_impacts.npy"
+
+TOKEN_PATTERN = re.compile(r"\w+(?:[.&'-]\w+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in is it its of on or our she that the
+their them they this to was we were what when where which who why will with you your
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, keeping tickers and names like s&p, u.s. or al-sadr whole"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def bm25_idf(count, document_frequency):
+    """Okapi BM25 inverse document frequency; works on scalars and arrays"""
+    return np.log(1.0 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+class BM25Index:
+    """Okapi BM25 over the chunks of one snapshot, keyed by the same row ids as FAISS.
+
+    Posting lists are stored as one concatenated int32 row array and one float32
+    array of precomputed per-posting BM25 scores ("impacts"), sliced per term
+    through an offset table, and are memory-mapped like the rest of the
+    snapshot. A query only sums the impacts of its terms.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, BM25_META_FILE)) as f:
+            meta = json.load(f)
+        with open(os.path.join(path, BM25_VOCAB_FILE), encoding="utf-8") as f:
+            self._terms = {term: i for i, term in enumerate(f.read().split("\n")) if term}
+
+        self.count = meta["count"]
+        self._offsets = np.load(os.path.join(path, BM25_OFFSETS_FILE), mmap_mode="r")
+        self._rows = np.load(os.path.join(path, BM25_ROWS_FILE), mmap_mode="r")
+        self._impacts = np.load(os.path.join(path, BM25_IMPACTS_FILE), mmap_mode="r")
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        """Load the BM25 index of a snapshot, or None for snapshots built without one"""
+        if not os.path.exists(os.path.join(path, BM25_META_FILE)):
+            return None
+        return cls(path)
+
+    def document_frequency(self, term: str) -> int:
+        """Number of rows containing ``term``"""
+        term_id = self._terms.get(term)
+        return 0 if term_id is None else int(self._offsets[term_id + 1] - self._offsets[term_id])
+
+    def search(self, query: str, k: int, idf: Optional[Dict[str, float]] = None) -> List[Tuple[int, float]]:
+        """Top ``k`` (row, BM25 score) pairs, best first
+
+        ``idf`` replaces this index's own IDF per query term, so that indexes over
+        different sets of rows can be scored with shared collection statistics.
+        """
+        scores = None
+        for term in set(tokenize(query)):
+            term_id = self._terms.get(term)
+            if term_id is None:
+                continue
+
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            if scores is None:
+                scores = np.zeros(self.count, dtype=np.float32)
+            impacts = self._impacts[start:end]
+            if idf is not None:
+                impacts = impacts * np.float32(idf.get(term, 0.0) / bm25_idf(self.count, end - start))
+            # Rows are unique within a posting list, so fancy-index += is safe
+            scores[self._rows[start:end]] += impacts
+
+        if scores is None:
+            return []
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [(int(row), float(scores[row])) for row in top[np.argsort(-scores[top])]]
+
+class BM25Writer:
+    """Collects term frequencies row by row in flat arrays and writes the posting lists"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._terms: Dict[str, int] = {}
+        self._term_ids = array("i")
+        self._rows = array("i")
+        self._tfs = array("H")
+        self._lengths = array("i")
+
+    def add(self, row: int, text: str):
+        tokens = tokenize(text)
+        self._lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            self._term_ids.append(self._terms.setdefault(term, len(self._terms)))
+            self._rows.append(row)
+            self._tfs.append(min(tf, 65535))
+
+    def close(self, path: str):
+        term_ids = np.frombuffer(self._term_ids, dtype=np.int32)
+
+        # Group postings by term; a stable sort keeps rows ascending within each list
+        order = np.argsort(term_ids, kind="stable")
+        counts = np.bincount(term_ids, minlength=len(self._terms))
+        offsets = np.zeros(len(self._terms) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        # Okapi BM25 contribution of every posting, computed once at build time
+        count = len(self._lengths)
+        lengths = np.frombuffer(self._lengths, dtype=np.int32)
+        rows = np.frombuffer(self._rows, dtype=np.int32)[order]
+        tfs = np.frombuffer(self._tfs, dtype=np.uint16)[order].astype(np.float32)
+        idf = bm25_idf(count, counts).astype(np.float32)
+        avg_length = max(float(lengths.mean()), 1.0) if count else 1.0
+        norm = self.k1 * (1.0 - self.b + self.b * lengths / avg_length)
+        impacts = np.repeat(idf, counts) * tfs * (self.k1 + 1.0) / (tfs + norm[rows].astype(np.float32))
+
+        with open(os.path.join(path, BM25_VOCAB_FILE), "w", encoding="utf-8") as f:
+            f.write("\n".join(self._terms))
+        np.save(os.path.join(path, BM25_OFFSETS_FILE), offsets)
+        np.save(os.path.join(path, BM25_ROWS_FILE), rows)
+        np.save(os.path.join(path, BM25_IMPACTS_FILE), impacts.astype(np.float32))
+        with open(os.path.join(path, BM25_META_FILE), "w") as f:
+            json.dump({"count": count, "terms": len(self._terms), "k1": self.k1, "b": self.b}, f)
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int, rrf_k: int = 60) -> List[Hashable]:
+    """Merge ranked lists of hit ids by summing 1 / (rrf_k + rank) per id"""
+    scores: Dict[Hashable, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking):
+            scores[hit] += 1.0 / (rrf_k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
@@ -0,0 +1,161 @@
+import os
+import re
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.bm25_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+
+# Shortest shared run of characters treated as splitter overlap between two chunks
+MIN_OVERLAP_CHARS = 20
+
+def merge_overlapping(first: str, second: str) -> Optional[str]:
+    """Join two chunks of one article if the end of one is the start of the other"""
+    for head, tail in ((first, second), (second, first)):
+        probe = tail[:MIN_OVERLAP_CHARS]
+        if len(probe) < MIN_OVERLAP_CHARS:
+            continue
+        position = head.find(probe)
+        while position != -1:
+            overlap = len(head) - position
+            if tail.startswith(head[position:]):
+                return head + tail[overlap:]
+            position = head.find(probe, position + 1)
+    return None
+
+class ContextBuilder:
+    """Assembles retrieved chunks into a prompt context that fits a token budget.
+
+    Chunks of the same article are stitched back together where the splitter
+    overlapped them, sentences that repeat an earlier one are dropped, and if
+    the result is still over budget the sentences most relevant to the
+    question are kept, in their original order.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1000"))
+        self.dedup_threshold = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+        self._encoding = None
+
+    def load(self):
+        """Load the LLM's tokenizer; without tiktoken, tokens are estimated from length"""
+        try:
+            import tiktoken
+
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                logger.warning(f"tiktoken has no encoding for {self.model}, counting context tokens with cl100k_base")
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable ({e}), estimating context tokens as characters / 4")
+
+    def count_tokens(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def build(self, question: str, docs: Sequence) -> Tuple[str, Dict[str, int]]:
+        """Context for ``docs`` in retrieval order, with its token count and the tokens saved over joining them whole"""
+        original = "\n\n".join(doc.page_content for doc in docs)
+        passages = self._drop_repeated(self._merge_by_url(docs))
+
+        text = "\n\n".join(" ".join(sentences) for sentences in passages)
+        tokens = self.count_tokens(text)
+        if self.token_budget and tokens > self.token_budget:
+            text = self._fit_budget(question, passages)
+            tokens = self.count_tokens(text)
+
+        original_tokens = self.count_tokens(original)
+        return text, {
+            "tokens": tokens,
+            "original_tokens": original_tokens,
+            "tokens_saved": max(original_tokens - tokens, 0)
+        }
+
+    def _merge_by_url(self, docs: Sequence) -> List[str]:
+        """One passage per contiguous run of chunks from the same article, best-ranked article first"""
+        by_url: Dict[str, List[str]] = {}
+        for i, doc in enumerate(docs):
+            passages = by_url.setdefault(doc.metadata.get("url") or f"#{i}", [])
+            text = doc.page_content
+            # Keep merging until the passage no longer touches any other one
+            merged = True
+            while merged:
+                merged = False
+                for j, passage in enumerate(passages):
+                    joined = merge_overlapping(passage, text)
+                    if joined is not None:
+                        text = joined
+                        del passages[j]
+                        merged = True
+                        break
+            passages.append(text)
+        return [passage for passages in by_url.values() for passage in passages]
+
+    def _drop_repeated(self, passages: List[str]) -> List[List[str]]:
+        """Split passages into sentences, dropping any that nearly repeat an earlier sentence"""
+        kept_terms: List[frozenset] = []
+        result = []
+        for passage in passages:
+            sentences = []
+            for sentence in SENTENCE_BOUNDARY.split(passage.strip()):
+                terms = frozenset(tokenize(sentence))
+                if terms and any(
+                    len(terms & other) / len(terms | other) >= self.dedup_threshold for other in kept_terms
+                ):
+                    continue
+                if terms:
+                    kept_terms.append(terms)
+                sentences.append(sentence)
+            if sentences:
+                result.append(sentences)
+        return result
+
+    def _fit_budget(self, question: str, passages: List[List[str]]) -> str:
+        """Keep the highest-scoring sentences within the budget, in document order
+
+        A sentence scores the idf-weighted share of question terms it contains,
+        with a small preference for better-ranked passages and earlier sentences.
+        Gaps between kept sentences are marked with an ellipsis.
+        """
+        sentences: List[Tuple[int, int, str]] = [
+            (p, s, sentence) for p, passage in enumerate(passages) for s, sentence in enumerate(passage)
+        ]
+        terms = [set(tokenize(sentence)) for _, _, sentence in sentences]
+        query = set(tokenize(question))
+        document_frequency = {term: sum(term in sentence_terms for sentence_terms in terms) for term in query}
+        idf = {term: np.log(1 + len(sentences) / (1 + df)) for term, df in document_frequency.items()}
+        total_idf = sum(idf.values()) or 1.0
+
+        scores = [
+            sum(idf[term] for term in query & sentence_terms) / total_idf
+            + 0.1 / (1 + p) + 0.05 / (1 + s)
+            for (p, s, _), sentence_terms in zip(sentences, terms)
+        ]
+
+        remaining = self.token_budget
+        selected = set()
+        for i in sorted(range(len(sentences)), key=lambda i: -scores[i]):
+            # Room for the joining space and a possible gap marker
+            cost = self.count_tokens(sentences[i][2]) + 2
+            if cost <= remaining:
+                selected.add(i)
+                remaining -= cost
+
+        parts: Dict[int, List[str]] = {}
+        previous: Dict[int, int] = {}
+        for i in sorted(selected):
+            p, s, sentence = sentences[i]
+            passage = parts.setdefault(p, [])
+            if (passage and s != previous[p] + 1) or (not passage and s > 0):
+                passage.append("...")
+            passage.append(sentence)
+            previous[p] = s
+        return "\n\n".join(" ".join(parts[p]) for p in sorted(parts))
@@ -0,0 +1,185 @@
+import os
+import re
+import zlib
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Prime just above 2**32; crc32 shingle hashes and the permutation coefficients
+# stay below it, so (a * x + b) never overflows uint64
+MINHASH_PRIME = np.uint64((1 << 32) + 15)
+
+class DedupService:
+    """Collapses near-duplicate articles, such as one wire story carried by several
+    outlets, using MinHash signatures over word shingles and LSH banding.
+
+    Each article is hashed once and looked up in ``bands`` buckets, and a
+    collision is confirmed against the first article seen in that bucket, so the
+    stage stays linear in the number of articles.
+
+    Signatures of the last ``memory_size`` indexed articles are kept between
+    calls, so a scheduled poll can also drop a story that another outlet already
+    carried in an earlier poll.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+        self.threshold = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+        self.shingle_size = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+        self.num_perm = int(os.getenv("DEDUP_NUM_PERM", "64"))
+        self.bands = int(os.getenv("DEDUP_BANDS", "16"))
+        self.memory_size = int(os.getenv("DEDUP_MEMORY_SIZE", "100000"))
+        if self.num_perm % self.bands:
+            raise ValueError(f"DEDUP_NUM_PERM ({self.num_perm}) must be a multiple of DEDUP_BANDS ({self.bands})")
+
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, 1 << 32, size=self.num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=self.num_perm, dtype=np.uint64)
+
+        # Signatures of indexed articles by article key, oldest first, and the
+        # key of the first indexed article in each LSH bucket
+        self._indexed: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._indexed_buckets: List[Dict[bytes, str]] = [{} for _ in range(self.bands)]
+
+    def deduplicate(self, articles: List[Dict], against_indexed: bool = False) -> Tuple[List[Dict], Dict[str, float]]:
+        """Return one canonical article per near-duplicate cluster, plus dedup stats
+
+        The canonical article is the longest copy; the others are listed in its
+        ``alternate_sources``. With ``against_indexed``, clusters that duplicate an
+        already indexed article under another URL are dropped as well.
+        """
+        if not self.enabled or not articles:
+            return articles, self._stats(len(articles), len(articles))
+
+        rows = self.num_perm // self.bands
+        parent = list(range(len(articles)))
+        buckets: List[Dict[bytes, int]] = [{} for _ in range(self.bands)]
+        signatures: List[Optional[np.ndarray]] = []
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, article in enumerate(articles):
+            signature = self._signature(article.get("content", ""))
+            signatures.append(signature)
+            if signature is None:
+                continue
+
+            for band, bucket in enumerate(buckets):
+                key = signature[band * rows:(band + 1) * rows].tobytes()
+                first = bucket.setdefault(key, i)
+                if first != i and find(first) != find(i) and self._similarity(signature, signatures[first]) >= self.threshold:
+                    parent[find(i)] = find(first)
+
+        clusters: Dict[int, List[int]] = {}
+        for i in range(len(articles)):
+            clusters.setdefault(find(i), []).append(i)
+
+        canonical = []
+        for members in clusters.values():
+            best = max(members, key=lambda i: len(articles[i].get("content", "")))
+            if against_indexed and self._is_indexed(self._key(articles[best]), signatures[best]):
+                continue
+            if len(members) == 1:
+                canonical.append(articles[best])
+                continue
+
+            article = dict(articles[best])
+            article["alternate_sources"] = [
+                {
+                    "title": articles[i].get("title", ""),
+                    "url": articles[i].get("url", ""),
+                    "source": articles[i].get("source", "RSS Feed")
+                }
+                for i in members if i != best
+            ]
+            canonical.append(article)
+
+        stats = self._stats(len(articles), len(canonical))
+        logger.info(
+            f"Collapsed {stats['duplicates']} near-duplicate articles "
+            f"({stats['dedup_ratio']:.1%}), {len(canonical)} remain"
+        )
+        return canonical, stats
+
+    def remember(self, articles: List[Dict], replace: bool = False):
+        """Record articles that were indexed; ``replace`` forgets everything indexed before"""
+        if not self.enabled:
+            return
+        if replace:
+            self._indexed.clear()
+            self._indexed_buckets = [{} for _ in range(self.bands)]
+
+        for article in articles:
+            key = self._key(article)
+            signature = self._signature(article.get("content", ""))
+            if signature is None:
+                continue
+            if key in self._indexed:
+                self._forget(key)
+            self._indexed[key] = signature
+            for bucket, band_key in zip(self._indexed_buckets, self._band_keys(signature)):
+                bucket.setdefault(band_key, key)
+
+        while len(self._indexed) > self.memory_size:
+            self._forget(next(iter(self._indexed)))
+
+    def _is_indexed(self, key: str, signature: Optional[np.ndarray]) -> bool:
+        """Whether an indexed article under another key is a near-duplicate of this signature"""
+        if signature is None:
+            return False
+        for bucket, band_key in zip(self._indexed_buckets, self._band_keys(signature)):
+            match = bucket.get(band_key)
+            # The same URL coming back is an update, which the index upserts
+            if match is not None and match != key and self._similarity(signature, self._indexed[match]) >= self.threshold:
+                return True
+        return False
+
+    def _forget(self, key: str):
+        signature = self._indexed.pop(key)
+        for bucket, band_key in zip(self._indexed_buckets, self._band_keys(signature)):
+            if bucket.get(band_key) == key:
+                del bucket[band_key]
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        rows = self.num_perm // self.bands
+        return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+    def _key(self, article: Dict) -> str:
+        """Article key as the index uses it: URL, falling back to the title"""
+        return article.get("url") or article.get("title", "")
+
+    def _signature(self, content: str) -> Optional[np.ndarray]:
+        """MinHash signature of an article's word shingles, or None if it has no words"""
+        words = WORD_PATTERN.findall(content.lower())
+        if not words:
+            return None
+
+        size = min(self.shingle_size, len(words))
+        shingles = np.fromiter(
+            {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)},
+            dtype=np.uint64
+        )
+        hashes = (self._a[:, None] * shingles[None, :] + self._b[:, None]) % MINHASH_PRIME
+        return hashes.min(axis=1)
+
+    def _similarity(self, a: np.ndarray, b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return float(np.mean(a == b))
+
+    def _stats(self, fetched: int, remaining: int) -> Dict[str, float]:
+        duplicates = fetched - remaining
+        return {
+            "fetched": fetched,
+            "duplicates": duplicates,
+            "dedup_ratio": duplicates / fetched if fetched else 0.0
+        }
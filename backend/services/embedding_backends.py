@@ -0,0 +1,183 @@
+import os
+import json
+import shutil
+import logging
+import tempfile
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+DEFAULT_EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model-int8.onnx"
+ONNX_META_FILE = "meta.json"
+TOKENIZER_FILE = "tokenizer.json"
+
+def create_embeddings(model_name: Optional[str] = None, backend: Optional[str] = None,
+                      quantize: Optional[bool] = None, threads: Optional[int] = None):
+    """Embedding model for the configured backend
+
+    Every backend has the ``embed_documents`` / ``embed_query`` interface of
+    LangChain's HuggingFaceEmbeddings and returns L2-normalized vectors.
+    Arguments left as None are read from the environment.
+    """
+    model_name = model_name or os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+    backend = (backend or os.getenv("EMBEDDING_BACKEND", "torch")).lower()
+    if quantize is None:
+        quantize = os.getenv("EMBEDDING_QUANTIZE", "false").lower() == "true"
+    if threads is None:
+        threads = int(os.getenv("EMBEDDING_THREADS", "0"))
+
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"EMBEDDING_BACKEND must be one of {', '.join(EMBEDDING_BACKENDS)}, got {backend!r}")
+
+    logger.info(f"Loading {model_name} with the {backend} backend{' (int8)' if quantize else ''}")
+    if backend == "onnx":
+        cache_dir = os.getenv("EMBEDDING_CACHE_DIR", "embedding_models")
+        model_dir = os.path.join(cache_dir, model_name.replace("/", "--"))
+        if not os.path.exists(os.path.join(model_dir, ONNX_META_FILE)):
+            export_onnx(model_name, model_dir)
+        return ONNXEmbeddings(model_dir, quantize=quantize, threads=threads)
+    return _torch_embeddings(model_name, quantize, threads)
+
+def _torch_embeddings(model_name: str, quantize: bool, threads: int):
+    """sentence-transformers on PyTorch, optionally with int8 dynamic quantization of its Linear layers"""
+    import torch
+    from langchain.embeddings import HuggingFaceEmbeddings
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+    if quantize:
+        torch.quantization.quantize_dynamic(embeddings.client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return embeddings
+
+def export_onnx(model_name: str, model_dir: str):
+    """Export a sentence-transformers model, pooling and normalization included, to ONNX
+
+    Writes the fp32 graph, an int8 dynamically quantized copy, the fast
+    tokenizer and the settings needed to run them without PyTorch. The
+    directory is staged and renamed into place, so a crashed export is never
+    picked up.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Exporting {model_name} to ONNX in {model_dir}...")
+    model = SentenceTransformer(model_name, device="cpu")
+    model.eval()
+    tokenizer = model.tokenizer
+
+    class SentenceEmbedding(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids=None):
+            features = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if token_type_ids is not None:
+                features["token_type_ids"] = token_type_ids
+            return self.model(features)["sentence_embedding"]
+
+    sample = tokenizer(["an example sentence to trace", "another"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    parent = os.path.dirname(os.path.abspath(model_dir))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".export-", dir=parent)
+    try:
+        fp32_path = os.path.join(staging, ONNX_MODEL_FILE)
+        with torch.no_grad():
+            torch.onnx.export(
+                SentenceEmbedding(),
+                tuple(sample[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["sentence_embedding"],
+                dynamic_axes={
+                    **{name: {0: "batch", 1: "sequence"} for name in input_names},
+                    "sentence_embedding": {0: "batch"}
+                },
+                opset_version=14
+            )
+        quantize_dynamic(fp32_path, os.path.join(staging, ONNX_INT8_MODEL_FILE), weight_type=QuantType.QInt8)
+
+        tokenizer.backend_tokenizer.save(os.path.join(staging, TOKENIZER_FILE))
+        with open(os.path.join(staging, ONNX_META_FILE), "w") as f:
+            json.dump({
+                "model": model_name,
+                "dimension": model.get_sentence_embedding_dimension(),
+                "max_seq_length": model.max_seq_length,
+                "pad_token": tokenizer.pad_token,
+                "pad_token_id": tokenizer.pad_token_id,
+                "input_names": input_names
+            }, f)
+
+        if os.path.exists(model_dir):
+            shutil.rmtree(model_dir)
+        os.rename(staging, model_dir)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+class ONNXEmbeddings:
+    """Sentence embeddings from an ONNX export, run with ONNX Runtime and a Rust tokenizer.
+
+    Neither PyTorch nor sentence-transformers is needed at runtime. Texts are
+    sorted by length before batching so each batch pads to a similar length,
+    the way SentenceTransformer.encode does.
+    """
+
+    def __init__(self, model_dir: str, quantize: bool = False, threads: int = 0, batch_size: int = 32):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, ONNX_META_FILE)) as f:
+            meta = json.load(f)
+        self.dimension = meta["dimension"]
+        self.input_names = meta["input_names"]
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(meta["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=meta["pad_token_id"], pad_token=meta["pad_token"])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, ONNX_INT8_MODEL_FILE if quantize else ONNX_MODEL_FILE),
+            options,
+            providers=["CPUExecutionProvider"]
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        for start in range(0, len(texts), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encodings = self.tokenizer.encode_batch([texts[i] for i in batch])
+            inputs = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)
+            }
+            vectors[batch] = self.session.run(None, {name: inputs[name] for name in self.input_names})[0]
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.maximum(norms, 1e-12)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
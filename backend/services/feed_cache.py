@@ -0,0 +1,66 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class FeedCache:
+    """Persistent per-feed validators and parsed articles for conditional requests"""
+
+    def __init__(self, path: str = "data/feed_cache.json"):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        """Load cached entries from disk if available"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+                logger.info(f"Loaded feed cache with {len(self.entries)} feeds")
+        except Exception as e:
+            logger.warning(f"Could not load feed cache, starting empty: {e}")
+            self.entries = {}
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Get the cached entry for a feed URL"""
+        return self.entries.get(url)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for a feed URL"""
+        headers = {}
+        entry = self.entries.get(url)
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def update(self, url: str, etag: Optional[str], last_modified: Optional[str],
+               body_hash: str, articles: List[Dict]):
+        """Store the validators, body hash and parsed articles for a feed URL"""
+        self.entries[url] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body_hash": body_hash,
+            "articles": articles
+        }
+        self._dirty = True
+
+    def save(self):
+        """Atomically write the cache to disk if it changed"""
+        if not self._dirty:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
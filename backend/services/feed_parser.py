@@ -0,0 +1,216 @@
+import os
+import re
+import time
+import html
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.metrics import INGEST_STAGE_SECONDS, registry
+
+logger = logging.getLogger(__name__)
+
+PARSE_ENTRIES = registry.counter("rss_parse_entries_total", "Feed entries parsed and cleaned, per parser process", ["worker"])
+PARSE_CPU_SECONDS = registry.counter(
+    "rss_parse_cpu_seconds_total",
+    "CPU time spent parsing and cleaning feeds, per parser process (entries / seconds is entries/sec per core)",
+    ["worker"]
+)
+PARSE_ENTRIES_PER_SECOND = registry.gauge(
+    "rss_parse_entries_per_second",
+    "Entries parsed per CPU second by each parser process over its lifetime",
+    ["worker"]
+)
+
+WHITESPACE = re.compile(r"\s+")
+TAG = re.compile(r"<[^>]*>")
+SCRIPT_OR_STYLE = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+CLEANERS = ("lxml", "regex", "bs4")
+
+# Entries kept per feed
+MAX_ENTRIES = 20
+# Shorter articles are skipped
+MIN_CONTENT_CHARS = 100
+
+def clean_html(content: str, cleaner: str = "lxml") -> str:
+    """Text of an HTML fragment with whitespace collapsed
+
+    ``lxml`` parses with libxml2; ``bs4`` is BeautifulSoup's pure-Python
+    html.parser; ``regex`` strips tags without building a tree, and is also the
+    fallback when lxml cannot parse a fragment. lxml and regex drop script and
+    style bodies, which feedparser's sanitizer removes before bs4 sees them.
+    """
+    if not content:
+        return ""
+    if cleaner == "lxml":
+        text = _lxml_text(content)
+    elif cleaner == "bs4":
+        from bs4 import BeautifulSoup
+
+        text = BeautifulSoup(content, "html.parser").get_text()
+    else:
+        text = _strip_tags(content)
+    return WHITESPACE.sub(" ", text).strip()
+
+def _strip_tags(content: str) -> str:
+    return html.unescape(TAG.sub("", SCRIPT_OR_STYLE.sub("", content)))
+
+def _lxml_text(content: str) -> str:
+    from lxml import etree
+    from lxml import html as lxml_html
+
+    # Plain-text summaries need no parsing
+    if "<" not in content and "&" not in content:
+        return content
+    try:
+        root = lxml_html.fragment_fromstring(content, create_parent="div")
+    except (etree.ParserError, ValueError):
+        return _strip_tags(content)
+    for element in list(root.iter("script", "style")):
+        element.drop_tree()
+    return root.text_content()
+
+def extract_content(entry, cleaner: str = "lxml") -> str:
+    """Cleaned text of an entry's content, summary or description"""
+    content = ""
+    if entry.get("content"):
+        content = entry.content[0].value
+    elif entry.get("summary"):
+        content = entry.summary
+    elif entry.get("description"):
+        content = entry.description
+    return clean_html(content, cleaner)
+
+def parse_date(entry) -> str:
+    """Publication date as ISO 8601 UTC, or "" if the entry has none
+
+    Undated entries are stamped when they are first indexed; stamping them here
+    would give the same entry a new date, and content hash, on every parse.
+    """
+    try:
+        if entry.get("published_parsed"):
+            return datetime(*entry.published_parsed[:6]).isoformat()
+        if entry.get("published"):
+            return entry.published
+    except Exception:
+        pass
+    return ""
+
+def parse_feed(content: bytes, source: str, cleaner: str = "lxml") -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+    """Parse raw feed bytes into article records, with timing stats for the caller
+
+    Runs in a parser process, so it takes and returns only plain picklable data.
+    """
+    import feedparser
+
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    # Every tag is stripped during cleaning anyway, so feedparser's own HTML
+    # sanitizing and link rewriting are wasted work outside the legacy bs4 path
+    legacy = cleaner == "bs4"
+    feed = feedparser.parse(content, sanitize_html=legacy, resolve_relative_uris=legacy)
+    parse_seconds = time.perf_counter() - start
+
+    articles = []
+    clean_seconds = 0.0
+    entries = feed.entries[:MAX_ENTRIES]
+    for entry in entries:
+        try:
+            clean_start = time.perf_counter()
+            text = extract_content(entry, cleaner)
+            clean_seconds += time.perf_counter() - clean_start
+            if len(text) < MIN_CONTENT_CHARS:
+                continue
+            articles.append({
+                "title": entry.get("title", "").strip(),
+                "content": text,
+                "url": entry.get("link", ""),
+                "published": parse_date(entry),
+                "source": source
+            })
+        except Exception as e:
+            logger.warning(f"Error processing entry: {e}")
+
+    return articles, {
+        "worker": os.getpid(),
+        "entries": len(entries),
+        "parse_seconds": parse_seconds,
+        "clean_seconds": clean_seconds,
+        "cpu_seconds": time.process_time() - start_cpu
+    }
+
+def available_cpus() -> int:
+    """CPUs this process may run on, which INGEST_WORKER_CPUS can narrow below the host's count"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+class FeedParserPool:
+    """Parses downloaded feeds on a pool of worker processes.
+
+    feedparser and HTML cleaning are pure CPU work that holds the GIL, so they
+    run in separate processes: the event loop only ships raw feed bytes out and
+    gets compact article records back, and parsing many feeds scales with the
+    number of cores. Workers are started with ``spawn`` so they do not inherit
+    the parent's threads or loaded models.
+    """
+
+    def __init__(self):
+        self.workers = int(os.getenv("RSS_PARSE_WORKERS", "0")) or available_cpus()
+        self.cleaner = os.getenv("RSS_HTML_CLEANER", "lxml").lower()
+        if self.cleaner not in CLEANERS:
+            logger.warning(f"Unknown RSS_HTML_CLEANER {self.cleaner!r}, using lxml")
+            self.cleaner = "lxml"
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Lifetime entries and CPU seconds per parser process
+        self._totals: Dict[str, List[float]] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Get the process pool, starting it on first use"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def parse(self, content: bytes, source: str) -> List[Dict[str, str]]:
+        """Articles of a downloaded feed, parsed on the pool"""
+        loop = asyncio.get_running_loop()
+        try:
+            articles, stats = await loop.run_in_executor(self._get_executor(), parse_feed, content, source, self.cleaner)
+        except BrokenProcessPool:
+            # A crashed parser takes the whole pool down; start a fresh one next time
+            self._executor = None
+            raise
+        self._record(stats)
+        return articles
+
+    def _record(self, stats: Dict[str, Any]):
+        worker = str(stats["worker"])
+        INGEST_STAGE_SECONDS.observe(stats["parse_seconds"], stage="feed_parse")
+        INGEST_STAGE_SECONDS.observe(stats["clean_seconds"], stage="html_clean")
+        PARSE_ENTRIES.inc(stats["entries"], worker=worker)
+        PARSE_CPU_SECONDS.inc(stats["cpu_seconds"], worker=worker)
+
+        totals = self._totals.setdefault(worker, [0, 0.0])
+        totals[0] += stats["entries"]
+        totals[1] += stats["cpu_seconds"]
+        if totals[1] > 0:
+            PARSE_ENTRIES_PER_SECOND.set(totals[0] / totals[1], worker=worker)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Entries, CPU seconds and entries per CPU second of each parser process"""
+        return {
+            worker: {"entries": entries, "cpu_seconds": seconds, "entries_per_second": entries / seconds if seconds else 0.0}
+            for worker, (entries, seconds) in self._totals.items()
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,123 @@
+import os
+import time
+import hashlib
+import logging
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from services.metrics import registry
+from services.rss_service import RSSService
+
+logger = logging.getLogger(__name__)
+
+FEED_POLLS = registry.counter("scheduler_feed_polls_total", "Scheduled feed polls by outcome (new, quiet)", ["feed", "result"])
+FEED_NEW_ARTICLES = registry.counter("scheduler_new_articles_total", "New or changed articles found by scheduled polls", ["feed"])
+FEED_POLL_INTERVAL = registry.gauge("scheduler_poll_interval_seconds", "Current polling interval per feed", ["feed"])
+
+class FeedState:
+    """Polling schedule and publishing-rate estimate of one feed"""
+
+    def __init__(self, url: str, interval: float, next_poll: float):
+        self.url = url
+        self.interval = interval
+        self.next_poll = next_poll
+        self.last_poll: Optional[float] = None
+        # New items per second, exponentially smoothed over polls
+        self.rate = 0.0
+        # Content hash of each item in the latest fetch, by URL
+        self.items: Dict[str, str] = {}
+
+    def to_dict(self) -> Dict:
+        return {
+            "url": self.url,
+            "interval": self.interval,
+            "next_poll": self.next_poll,
+            "last_poll": self.last_poll,
+            "rate_per_hour": self.rate * 3600
+        }
+
+class FeedScheduler:
+    """Polls each feed on its own interval, adapted to how often the feed publishes.
+
+    After every poll the feed's rate of new items is re-estimated and its
+    interval set so that a poll finds about ``target_items`` new items, within
+    ``[min_interval, max_interval]``. A feed that keeps coming back empty backs
+    off geometrically, and a busy feed is polled more often. Everything listed
+    on a feed's first poll is returned for indexing but not counted towards its
+    rate.
+
+    The clock is injectable, so schedules can be driven by a fake clock in
+    simulations.
+    """
+
+    def __init__(self, rss_service: RSSService, clock: Callable[[], float] = time.time):
+        self.rss_service = rss_service
+        self.clock = clock
+        self.min_interval = float(os.getenv("SCHEDULER_MIN_INTERVAL", "120"))
+        self.max_interval = float(os.getenv("SCHEDULER_MAX_INTERVAL", "3600"))
+        self.initial_interval = float(os.getenv("SCHEDULER_INITIAL_INTERVAL", "600"))
+        self.target_items = float(os.getenv("SCHEDULER_TARGET_ITEMS", "1"))
+        self.smoothing = float(os.getenv("SCHEDULER_SMOOTHING", "0.3"))
+        self.backoff = float(os.getenv("SCHEDULER_BACKOFF", "1.5"))
+        self.feeds: Dict[str, FeedState] = {}
+
+    def sync_feeds(self):
+        """Track the RSS service's current sources, polling newly added ones right away"""
+        now = self.clock()
+        sources = set(self.rss_service.rss_sources)
+        for url in sources - set(self.feeds):
+            self.feeds[url] = FeedState(url, self.initial_interval, now)
+        for url in set(self.feeds) - sources:
+            del self.feeds[url]
+
+    def next_due(self) -> Optional[float]:
+        """Clock time of the next scheduled poll"""
+        return min((state.next_poll for state in self.feeds.values()), default=None)
+
+    async def poll_due(self) -> List[Dict]:
+        """Poll every feed that is due and return the articles that are new or changed since its last poll"""
+        self.sync_feeds()
+        now = self.clock()
+        due = [url for url, state in self.feeds.items() if state.next_poll <= now]
+        if not due:
+            return []
+
+        results = await self.rss_service.fetch_feeds(due)
+        now = self.clock()
+        new_articles = []
+        for url in due:
+            new_articles.extend(self._record_poll(self.feeds[url], results.get(url, []), now))
+        return new_articles
+
+    def _record_poll(self, state: FeedState, articles: List[Dict], now: float) -> List[Dict]:
+        """Diff a poll against the previous one and reschedule the feed"""
+        keys = [article.get("url") or article.get("title", "") for article in articles]
+        items = {
+            key: hashlib.sha1(article.get("content", "").encode("utf-8")).hexdigest()
+            for key, article in zip(keys, articles)
+        }
+        new = [article for key, article in zip(keys, articles) if state.items.get(key) != items[key]]
+        first_poll = state.last_poll is None
+        if articles:
+            # A failed or empty fetch keeps the previous listing to diff against
+            state.items = items
+
+        if not first_poll:
+            elapsed = max(now - state.last_poll, 1.0)
+            state.rate = self.smoothing * len(new) / elapsed + (1 - self.smoothing) * state.rate
+            if new and state.rate > 0:
+                state.interval = self.target_items / state.rate
+            else:
+                state.interval *= self.backoff
+            state.interval = min(max(state.interval, self.min_interval), self.max_interval)
+
+        state.last_poll = now
+        state.next_poll = now + state.interval
+
+        host = urlparse(state.url).netloc
+        FEED_POLLS.inc(feed=host, result="new" if new and not first_poll else "quiet")
+        FEED_NEW_ARTICLES.inc(len(new), feed=host)
+        FEED_POLL_INTERVAL.set(state.interval, feed=host)
+        if new:
+            logger.info(f"{len(new)} new articles from {state.url}, next poll in {state.interval:.0f}s")
+        return new
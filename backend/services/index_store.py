@@ -0,0 +1,118 @@
+import os
+import time
+import uuid
+import shutil
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+
+# Seconds after which an uncommitted staging directory is considered abandoned
+STALE_STAGING_AGE = 3600
+
+class IndexStore:
+    """Versioned on-disk index snapshots behind an atomically flipped CURRENT pointer.
+
+    Each snapshot is written to its own directory, fsynced, and only then made
+    current by atomically replacing the CURRENT file. A crash mid-write leaves
+    the previous snapshot untouched, and other processes notice the new version
+    by re-reading CURRENT.
+    """
+
+    def __init__(self, root: str = "data/index", keep_versions: int = 3):
+        self.root = root
+        self.keep_versions = keep_versions
+
+    def current_version(self) -> Optional[str]:
+        """Read the version CURRENT points at"""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                version = f.read().strip()
+            return version or None
+        except FileNotFoundError:
+            return None
+
+    def version_path(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def begin(self) -> str:
+        """Create a staging directory for a new snapshot"""
+        os.makedirs(self.root, exist_ok=True)
+
+        # Version names sort chronologically
+        version = f"v{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        staging_path = os.path.join(self.root, f".tmp-{version}")
+        os.makedirs(staging_path)
+        return staging_path
+
+    def commit(self, staging_path: str) -> str:
+        """fsync a staged snapshot, move it into place and make it current"""
+        version = os.path.basename(staging_path)[len(".tmp-"):]
+        self._fsync_tree(staging_path)
+        os.rename(staging_path, self.version_path(version))
+
+        # Flip the pointer
+        pointer_tmp = os.path.join(self.root, f".{CURRENT_FILE}-{version}")
+        with open(pointer_tmp, "w") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer_tmp, os.path.join(self.root, CURRENT_FILE))
+        self._fsync_dir(self.root)
+
+        logger.info(f"Published index version {version}")
+        self.gc()
+        return version
+
+    def abort(self, staging_path: str):
+        """Throw away a staged snapshot"""
+        shutil.rmtree(staging_path, ignore_errors=True)
+
+    def versions(self) -> List[str]:
+        """All complete snapshot versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if name.startswith("v") and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def gc(self):
+        """Delete all but the newest ``keep_versions`` snapshots, never the current one"""
+        current = self.current_version()
+        versions = self.versions()
+        for version in versions[:-self.keep_versions] if self.keep_versions > 0 else versions:
+            if version == current:
+                continue
+            try:
+                shutil.rmtree(self.version_path(version))
+                logger.info(f"Removed old index version {version}")
+            except Exception as e:
+                logger.warning(f"Could not remove old index version {version}: {e}")
+
+        # Staging directories left behind by a crashed writer
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(".tmp-") and time.time() - os.path.getmtime(path) > STALE_STAGING_AGE:
+                shutil.rmtree(path, ignore_errors=True)
+                logger.info(f"Removed stale staging directory {name}")
+
+    def _fsync_tree(self, path: str):
+        for directory, _, files in os.walk(path):
+            for name in files:
+                fd = os.open(os.path.join(directory, name), os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            self._fsync_dir(directory)
+
+    def _fsync_dir(self, path: str):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
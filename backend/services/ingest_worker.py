@@ -0,0 +1,229 @@
+import os
+import time
+import fcntl
+import asyncio
+import logging
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from services.dedup_service import DedupService
+from services.feed_scheduler import FeedScheduler
+from services.job_store import JobStore
+from services.metrics import INGEST_STAGE_SECONDS, registry, timed
+from services.rag_service import RAGService
+from services.rss_service import RSSService
+
+logger = logging.getLogger(__name__)
+
+# Share of the overall progress bar taken by each rebuild stage
+REBUILD_STAGES = {
+    "fetching": (0, 30),
+    "deduplicating": (30, 32),
+    "splitting": (32, 35),
+    "embedding": (35, 95),
+    "saving": (95, 100)
+}
+
+class IngestWorker:
+    """Runs queued ingest jobs from the job store, one at a time, in its own process.
+
+    Between jobs it polls feeds on the FeedScheduler's adaptive per-feed
+    schedule and upserts new articles straight into the index, so queued
+    rebuilds always take priority over scheduled polls.
+
+    Only the process holding an exclusive flock on the ingest lock file runs
+    jobs; any other worker started alongside it (one per API process, say)
+    waits on the lock without loading models. The worker lowers its own CPU
+    priority and can be pinned to a CPU set, so rebuilds do not compete with
+    the API workers answering questions.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None):
+        self.store = store or JobStore()
+        self.lock_path = os.getenv("INGEST_LOCK_PATH", "data/ingest.lock")
+        self.poll_interval = float(os.getenv("INGEST_POLL_INTERVAL", "1.0"))
+        self.heartbeat_interval = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "10"))
+        self.nice = int(os.getenv("INGEST_WORKER_NICE", "10"))
+        self.cpus = [int(cpu) for cpu in os.getenv("INGEST_WORKER_CPUS", "").split(",") if cpu.strip()]
+        self.metrics_port = int(os.getenv("INGEST_METRICS_PORT", "0"))
+        self.schedule_enabled = os.getenv("INGEST_SCHEDULE", "true").lower() == "true"
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock_file = None
+
+    async def run(self, parent_pid: Optional[int] = None):
+        """Take the ingest lock, load the models and process jobs until the parent process exits"""
+        self._lower_priority()
+        while not self._acquire_lock():
+            if self._orphaned(parent_pid):
+                return
+            await asyncio.sleep(self.poll_interval)
+        logger.info(f"Ingest worker {self.worker_id} holds {self.lock_path}")
+
+        if self.metrics_port:
+            self._serve_metrics()
+
+        # Holding the lock means no other worker is running a job
+        await asyncio.to_thread(self.store.recover, 0)
+
+        self.rss_service = RSSService()
+        self.dedup_service = DedupService()
+        self.rag_service = RAGService()
+        self.scheduler = FeedScheduler(self.rss_service) if self.schedule_enabled else None
+        await self.rag_service.initialize()
+        await self._seed_dedup()
+
+        try:
+            while not self._orphaned(parent_pid):
+                job = await asyncio.to_thread(self.store.claim, self.worker_id)
+                if job is not None:
+                    await self._run_job(job)
+                    continue
+                if self.scheduler is not None:
+                    await self.poll_feeds()
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            await self.rss_service.close()
+
+    async def _run_job(self, job: Dict[str, Any]):
+        logger.info(f"Running {job['kind']} job {job['id']} (attempt {job['attempts']})")
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            result = await self._rebuild(job["id"], job["params"].get("incremental", True))
+            await asyncio.to_thread(self.store.finish, job["id"], result)
+            logger.info(f"Job {job['id']} succeeded")
+        except Exception as e:
+            logger.error(f"Error during rebuild: {e}")
+            await asyncio.to_thread(self.store.fail, job["id"], str(e))
+        finally:
+            heartbeat.cancel()
+
+    async def _rebuild(self, job_id: str, incremental: bool) -> Dict[str, Any]:
+        """Fetch, deduplicate and index the feeds, recording progress on the job"""
+        start = time.perf_counter()
+        report = self._progress_reporter(job_id)
+        report("fetching", 0.0, "Fetching RSS feeds...")
+
+        # Fetch articles from RSS feeds
+        articles = await self.rss_service.fetch_all_articles(progress_callback=report)
+
+        # Collapse the same story carried by several outlets
+        report("deduplicating", 0.0, f"Deduplicating {len(articles)} articles...")
+        with timed(INGEST_STAGE_SECONDS, "dedup"):
+            articles, dedup_stats = await asyncio.to_thread(self.dedup_service.deduplicate, articles, incremental)
+
+        # Rebuild the RAG index
+        result = await self.rag_service.rebuild_index(articles, incremental=incremental, progress_callback=report)
+        await asyncio.to_thread(self.dedup_service.remember, articles, not incremental)
+        INGEST_STAGE_SECONDS.observe(time.perf_counter() - start, stage="rebuild")
+
+        return {
+            **result,
+            "duplicates": dedup_stats["duplicates"],
+            "dedup_ratio": dedup_stats["dedup_ratio"]
+        }
+
+    async def poll_feeds(self) -> Optional[Dict[str, Any]]:
+        """Poll the feeds that are due and upsert their new articles into the index"""
+        try:
+            articles = await self.scheduler.poll_due()
+            if not articles:
+                return None
+
+            # Check against everything indexed so far, not just this poll's batch
+            with timed(INGEST_STAGE_SECONDS, "dedup"):
+                articles, _ = await asyncio.to_thread(self.dedup_service.deduplicate, articles, True)
+            if not articles:
+                return None
+            result = await self.rag_service.rebuild_index(articles, incremental=True)
+            await asyncio.to_thread(self.dedup_service.remember, articles)
+            logger.info(f"Scheduled upsert: {result['added']} chunks added, {result['removed']} removed")
+            return result
+        except Exception as e:
+            logger.error(f"Error during scheduled ingest: {e}")
+            return None
+
+    async def _seed_dedup(self):
+        """Load the signatures of the articles already in the index"""
+        try:
+            articles = await asyncio.to_thread(self.rag_service.indexed_articles)
+            await asyncio.to_thread(self.dedup_service.remember, articles, True)
+            logger.info(f"Seeded dedup with {len(articles)} indexed articles")
+        except Exception as e:
+            logger.warning(f"Could not seed dedup from the index: {e}")
+
+    def _progress_reporter(self, job_id: str):
+        """Progress callback mapping per-stage progress onto the job's overall progress
+
+        Writes are skipped unless the stage or the whole-percent progress changed,
+        or a second has passed, so per-batch callbacks do not flood the store.
+        """
+        last = {"stage": None, "progress": -1, "time": 0.0}
+
+        def report(stage: str, fraction: float, message: str):
+            low, high = REBUILD_STAGES[stage]
+            progress = int(low + (high - low) * fraction)
+            now = time.monotonic()
+            if stage == last["stage"] and progress == last["progress"] and now - last["time"] < 1.0:
+                return
+            last.update(stage=stage, progress=progress, time=now)
+            self.store.update(job_id, stage, progress, message)
+
+        return report
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await asyncio.to_thread(self.store.heartbeat, job_id)
+            except Exception as e:
+                logger.warning(f"Could not record heartbeat for job {job_id}: {e}")
+
+    def _acquire_lock(self) -> bool:
+        """Take the cross-process ingest lock without blocking; held until the process exits"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        lock_file = open(self.lock_path, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{self.worker_id}\n")
+        lock_file.flush()
+        self._lock_file = lock_file
+        return True
+
+    def _lower_priority(self):
+        try:
+            if self.nice:
+                os.nice(self.nice)
+            if self.cpus:
+                os.sched_setaffinity(0, self.cpus)
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Could not lower ingest worker priority: {e}")
+
+    def _orphaned(self, parent_pid: Optional[int]) -> bool:
+        """Whether the API process that spawned this worker has exited"""
+        return parent_pid is not None and os.getppid() != parent_pid
+
+    def _serve_metrics(self):
+        """Expose this process's ingest metrics, which the API's /metrics cannot see"""
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("0.0.0.0", self.metrics_port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logger.info(f"Serving ingest metrics on port {self.metrics_port}")
@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("succeeded", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress INTEGER NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+-- At most one queued or running job per kind, enforced across processes
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_one_active ON jobs(kind) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS jobs_by_kind ON jobs(kind, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_events_by_job ON job_events(job_id, id);
+"""
+
+class JobConflict(Exception):
+    """A job of the same kind is already queued or running"""
+
+    def __init__(self, job: Dict[str, Any]):
+        super().__init__(f"{job['kind']} job {job['id']} is already {job['status']}")
+        self.job = job
+
+class JobStore:
+    """Durable ingest jobs and their progress events in a local SQLite database.
+
+    Shared by the API workers, which enqueue jobs and read progress, and the
+    ingest worker process, which claims and runs them. SQLite's locking makes
+    every state change atomic across processes, so the one-active-job rule and
+    job claiming need no other coordination. Each call opens its own short-lived
+    connection, so the store is safe to use from any thread.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("JOB_DB_PATH", "data/jobs.db")
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.keep_jobs = int(os.getenv("JOB_KEEP", "50"))
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        # WAL keeps readers off the writer's lock; NORMAL skips an fsync per progress update
+        db.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that takes the database lock up front"""
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job, raising JobConflict if one of the same kind is already active"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as db:
+            try:
+                db.execute(
+                    "INSERT INTO jobs (id, kind, params, status, stage, message, created_at) "
+                    "VALUES (?, ?, ?, 'queued', 'queued', 'Waiting for the ingest worker...', ?)",
+                    (job_id, kind, json.dumps(params), now)
+                )
+            except sqlite3.IntegrityError:
+                active = db.execute(
+                    "SELECT * FROM jobs WHERE kind = ? AND status IN ('queued', 'running')", (kind,)
+                ).fetchone()
+                raise JobConflict(self._to_dict(active))
+            self._add_event(db, job_id, {"status": "queued", "stage": "queued", "progress": 0,
+                                         "message": "Waiting for the ingest worker..."})
+            self._prune(db, kind)
+        return self.get(job_id)
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job as running on ``worker`` and return it"""
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                "started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker, now, now, row["id"])
+            )
+            self._add_event(db, row["id"], {"status": "running", "stage": "starting", "progress": 0,
+                                             "message": "Starting..."})
+        return self.get(row["id"])
+
+    def update(self, job_id: str, stage: str, progress: int, message: str):
+        """Record progress, which also counts as a heartbeat"""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, message = ?, heartbeat_at = ? WHERE id = ?",
+                (stage, progress, message, time.time(), job_id)
+            )
+            self._add_event(db, job_id, {"status": "running", "stage": stage, "progress": progress, "message": message})
+
+    def heartbeat(self, job_id: str):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def finish(self, job_id: str, result: Dict[str, Any]):
+        self._close(job_id, "succeeded", "Rebuild completed successfully", result=result)
+
+    def fail(self, job_id: str, error: str):
+        self._close(job_id, "failed", f"Rebuild failed: {error}", error=error)
+
+    def _close(self, job_id: str, status: str, message: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None):
+        with self._transaction() as db:
+            row = db.execute("SELECT progress FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            progress = 100 if status == "succeeded" else row["progress"]
+            db.execute(
+                "UPDATE jobs SET status = ?, stage = ?, progress = ?, message = ?, result = ?, error = ?, "
+                "finished_at = ? WHERE id = ?",
+                (status, status, progress, message, json.dumps(result) if result is not None else None,
+                 error, time.time(), job_id)
+            )
+            self._add_event(db, job_id, {"status": status, "stage": status, "progress": progress,
+                                         "message": message, "result": result, "error": error})
+
+    def recover(self, stale_after: float) -> int:
+        """Requeue running jobs whose worker stopped heartbeating, failing those out of attempts
+
+        Called by the ingest worker before claiming, so a job interrupted by a
+        crash or restart is picked up again.
+        """
+        cutoff = time.time() - stale_after
+        recovered = 0
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT id, attempts FROM jobs WHERE status = 'running' AND heartbeat_at < ?", (cutoff,)
+            ).fetchall()
+            for row in rows:
+                if row["attempts"] >= self.max_attempts:
+                    message = f"Rebuild failed: worker stopped after {row['attempts']} attempts"
+                    db.execute(
+                        "UPDATE jobs SET status = 'failed', stage = 'failed', message = ?, error = ?, "
+                        "finished_at = ? WHERE id = ?",
+                        (message, "worker stopped", time.time(), row["id"])
+                    )
+                    self._add_event(db, row["id"], {"status": "failed", "stage": "failed", "message": message,
+                                                    "error": "worker stopped"})
+                else:
+                    message = "Worker stopped, waiting to retry..."
+                    db.execute(
+                        "UPDATE jobs SET status = 'queued', stage = 'queued', message = ?, worker = NULL WHERE id = ?",
+                        (message, row["id"])
+                    )
+                    self._add_event(db, row["id"], {"status": "queued", "stage": "queued", "progress": 0,
+                                                    "message": message})
+                    recovered += 1
+        if rows:
+            logger.warning(f"Recovered {len(rows)} interrupted jobs, {recovered} requeued")
+        return recovered
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def latest(self, kind: str) -> Optional[Dict[str, Any]]:
+        """Most recently created job of a kind"""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT * FROM jobs WHERE kind = ? ORDER BY created_at DESC LIMIT 1", (kind,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """Progress events of a job newer than event id ``after``, oldest first"""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT id, created_at, data FROM job_events WHERE job_id = ? AND id > ? ORDER BY id",
+                (job_id, after)
+            ).fetchall()
+        return [{"id": row["id"], "time": row["created_at"], **json.loads(row["data"])} for row in rows]
+
+    def _add_event(self, db: sqlite3.Connection, job_id: str, data: Dict[str, Any]):
+        db.execute(
+            "INSERT INTO job_events (job_id, created_at, data) VALUES (?, ?, ?)",
+            (job_id, time.time(), json.dumps(data))
+        )
+
+    def _prune(self, db: sqlite3.Connection, kind: str):
+        """Forget all but the newest ``keep_jobs`` finished jobs of a kind"""
+        old = [
+            row["id"] for row in db.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND status IN ('succeeded', 'failed') "
+                "ORDER BY created_at DESC LIMIT -1 OFFSET ?",
+                (kind, self.keep_jobs)
+            )
+        ]
+        for job_id in old:
+            db.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+            db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
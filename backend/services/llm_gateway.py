@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+LLM_QUEUE_SECONDS = registry.histogram("llm_queue_seconds", "Time LLM calls waited for a concurrency slot", ["mode"])
+LLM_IN_FLIGHT = registry.gauge("llm_in_flight", "LLM calls holding a concurrency slot")
+LLM_WAITING = registry.gauge("llm_waiting", "LLM calls waiting for a concurrency slot")
+LLM_ATTEMPTS = registry.counter("llm_attempts_total", "Upstream LLM requests by outcome (ok, error, timeout, cancelled)", ["result"])
+LLM_HEDGES = registry.counter("llm_hedges_total", "Hedged LLM requests launched, and how many finished first", ["result"])
+LLM_COALESCED = registry.counter("llm_coalesced_total", "Completions served by joining an identical in-flight prompt")
+LLM_REJECTED = registry.counter("llm_rejected_total", "LLM calls turned away because the gateway was saturated", ["reason"])
+
+class LLMSaturated(Exception):
+    """No concurrency slot became free in time; answer without the LLM"""
+
+class LLMGateway:
+    """Single async entry point to the OpenAI-compatible chat completions API.
+
+    - One pooled ``AsyncOpenAI`` client, so calls share keep-alive connections
+      instead of each tying up a thread.
+    - At most ``max_concurrency`` upstream calls at a time. Callers queue for a
+      slot, but once ``max_waiting`` are already queued, or a slot does not free
+      up within ``queue_timeout``, they get ``LLMSaturated`` right away so the
+      caller can fall back to the mock answer instead of piling up.
+    - Identical prompts that are in flight at the same time share one upstream
+      call.
+    - Every attempt is bounded by ``timeout``. An attempt still running after
+      ``hedge_delay`` gets a second, hedged copy, and the first to succeed wins.
+      Hedges draw on their own budget of ``max_hedges`` concurrent requests, so
+      they cap the extra upstream load and never take a caller's slot.
+      Failures are retried ``max_retries`` times with backoff, except client
+      errors that would fail again.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+        self.max_waiting = int(os.getenv("LLM_MAX_WAITING", "64"))
+        self.queue_timeout = float(os.getenv("LLM_QUEUE_TIMEOUT", "2.0"))
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "30"))
+        self.hedge_delay = float(os.getenv("LLM_HEDGE_DELAY", "5.0"))
+        self.max_hedges = int(os.getenv("LLM_MAX_HEDGES", "4"))
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "1"))
+        self.retry_backoff = float(os.getenv("LLM_RETRY_BACKOFF", "0.2"))
+        self.max_tokens = int(os.getenv("LLM_MAX_TOKENS", "500"))
+        self.temperature = float(os.getenv("LLM_TEMPERATURE", "0.3"))
+        self.client = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._hedge_semaphore = asyncio.Semaphore(self.max_hedges)
+        self._active = 0
+        self._waiting = 0
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def load(self, api_key: Optional[str], base_url: Optional[str] = None):
+        """Create the pooled async client; without an API key the gateway stays unavailable"""
+        if not api_key:
+            logger.warning("OPENAI_API_KEY not found, using mock responses")
+            return
+
+        import httpx
+        import openai
+
+        # Room for hedged copies on top of the regular slots
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency + self.max_hedges,
+            max_keepalive_connections=self.max_concurrency
+        )
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url or None,
+            max_retries=0,
+            timeout=self.timeout,
+            http_client=httpx.AsyncClient(limits=limits, timeout=self.timeout)
+        )
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._active,
+            "waiting": self._waiting,
+            "coalescing": len(self._in_flight)
+        }
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+
+    async def complete(self, messages: List[Dict[str, str]], timings: Optional[Dict[str, float]] = None) -> str:
+        """Answer text for ``messages``, sharing the call with any identical prompt in flight"""
+        key = self._prompt_key(messages)
+        shared = self._in_flight.get(key)
+        if shared is not None:
+            LLM_COALESCED.inc()
+            # Shielded, so one caller going away does not cancel everyone's answer
+            return await asyncio.shield(shared)
+
+        task = asyncio.ensure_future(self._complete_with_retries(messages, timings))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future):
+        self._in_flight.pop(key, None)
+        # Mark the error as seen even if every caller has gone away
+        if not task.cancelled():
+            task.exception()
+
+    async def stream(self, messages: List[Dict[str, str]], timings: Optional[Dict[str, float]] = None) -> AsyncIterator[str]:
+        """Answer tokens for ``messages`` as they arrive
+
+        Streams hold their slot until the last token, and are neither coalesced
+        nor hedged; ``timeout`` bounds the wait for each chunk.
+        """
+        await self._acquire("stream", timings)
+        stream = None
+        try:
+            stream = await asyncio.wait_for(self._create(messages, stream=True), self.timeout)
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                except StopAsyncIteration:
+                    break
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            LLM_ATTEMPTS.inc(result="ok")
+        except asyncio.TimeoutError:
+            LLM_ATTEMPTS.inc(result="timeout")
+            raise
+        except Exception:
+            LLM_ATTEMPTS.inc(result="error")
+            raise
+        finally:
+            # Give the connection back even if the reader stopped early
+            if stream is not None:
+                await stream.response.aclose()
+            self._release()
+
+    async def _complete_with_retries(self, messages: List[Dict[str, str]], timings: Optional[Dict[str, float]]) -> str:
+        attempt = 0
+        while True:
+            await self._acquire("complete", timings)
+            try:
+                return await self._hedged(messages)
+            except Exception as e:
+                if attempt >= self.max_retries or not self._retryable(e):
+                    raise
+                logger.warning(f"LLM request failed ({e!r}), retrying")
+            finally:
+                self._release()
+            attempt += 1
+            await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+    async def _hedged(self, messages: List[Dict[str, str]]) -> str:
+        """Run one attempt, adding a hedged copy if it is slow, and return the first success"""
+        primary = asyncio.ensure_future(self._attempt(messages))
+        pending = {primary}
+        hedged = False
+        try:
+            if self.hedge_delay > 0:
+                done, _ = await asyncio.wait(pending, timeout=self.hedge_delay)
+                # Skip the hedge rather than wait when the hedge budget is spent
+                if not done and not self._hedge_semaphore.locked():
+                    await self._hedge_semaphore.acquire()
+                    hedged = True
+                    LLM_HEDGES.inc(result="launched")
+                    pending.add(asyncio.ensure_future(self._attempt(messages)))
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            LLM_HEDGES.inc(result="won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            if hedged:
+                self._hedge_semaphore.release()
+
+    async def _attempt(self, messages: List[Dict[str, str]]) -> str:
+        try:
+            response = await asyncio.wait_for(self._create(messages), self.timeout)
+        except asyncio.TimeoutError:
+            LLM_ATTEMPTS.inc(result="timeout")
+            raise
+        except asyncio.CancelledError:
+            LLM_ATTEMPTS.inc(result="cancelled")
+            raise
+        except Exception:
+            LLM_ATTEMPTS.inc(result="error")
+            raise
+        LLM_ATTEMPTS.inc(result="ok")
+        return response.choices[0].message.content.strip()
+
+    def _create(self, messages: List[Dict[str, str]], stream: bool = False):
+        return self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            stream=stream
+        )
+
+    async def _acquire(self, mode: str, timings: Optional[Dict[str, float]]):
+        """Wait for a concurrency slot, or raise LLMSaturated without waiting when the queue is full"""
+        start = time.perf_counter()
+        if not self._semaphore.locked():
+            # A free slot is taken without yielding, so a burst cannot overshoot the limit
+            await self._semaphore.acquire()
+        elif self._waiting >= self.max_waiting:
+            LLM_REJECTED.inc(reason="queue_full")
+            raise LLMSaturated(f"{self._waiting} LLM calls already waiting")
+        else:
+            self._waiting += 1
+            LLM_WAITING.set(self._waiting)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                LLM_REJECTED.inc(reason="queue_timeout")
+                raise LLMSaturated(f"No LLM slot free within {self.queue_timeout}s")
+            finally:
+                self._waiting -= 1
+                LLM_WAITING.set(self._waiting)
+
+        waited = time.perf_counter() - start
+        LLM_QUEUE_SECONDS.observe(waited, mode=mode)
+        if timings is not None:
+            timings["llm_queue"] = timings.get("llm_queue", 0.0) + waited
+        self._active += 1
+        LLM_IN_FLIGHT.set(self._active)
+
+    def _release(self):
+        self._semaphore.release()
+        self._active -= 1
+        LLM_IN_FLIGHT.set(self._active)
+
+    def _retryable(self, error: Exception) -> bool:
+        """Timeouts, connection errors, rate limits and server errors; not other client errors"""
+        status = getattr(error, "status_code", None)
+        return status is None or status == 429 or status >= 500
+
+    def _prompt_key(self, messages: List[Dict[str, str]]) -> str:
+        payload = json.dumps([self.model, self.max_tokens, self.temperature, messages], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,134 @@
+import os
+import json
+import shutil
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.bm25_index import bm25_idf, tokenize
+from services.vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_DIR = "partitions"
+PARTITIONS_FILE = "partitions.json"
+
+# Partition names are the UTC start of their time bucket and sort chronologically
+PARTITION_NAME_FORMAT = "%Y%m%dT%H%M"
+
+# (start, end) as UTC epoch seconds, either end open when None
+TimeRange = Tuple[Optional[float], Optional[float]]
+
+# (partition, row, score)
+Hit = Tuple[str, int, float]
+
+def partition_name(timestamp: float, partition_hours: int) -> str:
+    """Name of the time bucket a timestamp falls into"""
+    span = partition_hours * 3600
+    start = timestamp - timestamp % span
+    return datetime.fromtimestamp(start, tz=timezone.utc).strftime(PARTITION_NAME_FORMAT)
+
+def partition_start(name: str) -> float:
+    return datetime.strptime(name, PARTITION_NAME_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+
+def link_partition(source: str, target: str):
+    """Reuse an unchanged partition in a new snapshot by hard-linking its files"""
+    os.makedirs(target)
+    for name in os.listdir(source):
+        try:
+            os.link(os.path.join(source, name), os.path.join(target, name))
+        except OSError:
+            shutil.copy2(os.path.join(source, name), os.path.join(target, name))
+
+class PartitionedIndex:
+    """A snapshot split into one VectorIndex per time bucket.
+
+    Queries only search the partitions their time range overlaps, and expiring
+    old data means leaving whole partitions out of the next snapshot. Row ids are
+    local to a partition, so hits are (partition, row) pairs.
+    """
+
+    def __init__(self, path: str, partitions: Dict[str, VectorIndex], partition_hours: int):
+        self.path = path
+        self.partitions = partitions
+        self.partition_hours = partition_hours
+
+    @classmethod
+    def load(cls, path: str) -> "PartitionedIndex":
+        partitions_file = os.path.join(path, PARTITIONS_FILE)
+        if not os.path.exists(partitions_file):
+            raise ValueError(f"Snapshot {path} predates time partitioning; run a full rebuild")
+        with open(partitions_file) as f:
+            meta = json.load(f)
+
+        partitions = {
+            name: VectorIndex.load(os.path.join(path, PARTITIONS_DIR, name))
+            for name in sorted(meta["partitions"])
+        }
+        return cls(path, partitions, meta["partition_hours"])
+
+    @staticmethod
+    def write_meta(path: str, partition_hours: int, counts: Dict[str, int]):
+        """Record the partitions of a staged snapshot"""
+        with open(os.path.join(path, PARTITIONS_FILE), "w") as f:
+            json.dump({"partition_hours": partition_hours, "partitions": counts}, f)
+
+    def __len__(self) -> int:
+        return sum(len(partition) for partition in self.partitions.values())
+
+    def partition_path(self, name: str) -> str:
+        return os.path.join(self.path, PARTITIONS_DIR, name)
+
+    def bounds(self, name: str) -> Tuple[float, float]:
+        start = partition_start(name)
+        return start, start + self.partition_hours * 3600
+
+    def overlaps(self, name: str, time_range: TimeRange) -> bool:
+        start, end = self.bounds(name)
+        return (time_range[0] is None or end > time_range[0]) and (time_range[1] is None or start <= time_range[1])
+
+    def search(self, vectors: np.ndarray, k: int, ranges: List[TimeRange],
+               nprobe: int = 0, ef_search: int = 0, refine: int = 0) -> List[List[Hit]]:
+        """Top ``k`` hits per partition for each query, scored by cosine similarity
+
+        Each partition is searched once with all the queries whose range overlaps
+        it. Hits are not filtered against the exact range bounds.
+        """
+        results: List[List[Hit]] = [[] for _ in range(len(vectors))]
+        for name, partition in self.partitions.items():
+            queries = [i for i, time_range in enumerate(ranges) if self.overlaps(name, time_range)]
+            if not queries:
+                continue
+
+            distances, rows = partition.search(vectors[queries], k, nprobe=nprobe, ef_search=ef_search, refine=refine)
+            for i, query_distances, query_rows in zip(queries, distances, rows):
+                # Squared L2 between unit vectors is 2 - 2 * cosine
+                results[i].extend(
+                    (name, int(row), 1.0 - float(distance) / 2.0)
+                    for distance, row in zip(query_distances, query_rows) if row != -1
+                )
+        return results
+
+    def keyword_search(self, query: str, k: int, time_range: TimeRange) -> List[Hit]:
+        """Top ``k`` BM25 hits per partition in the range
+
+        Term IDFs are computed over all the searched partitions together, so
+        scores from different partitions can be merged. Length normalization
+        still uses each partition's own average chunk length.
+        """
+        searched = [
+            (name, partition) for name, partition in self.partitions.items()
+            if partition.bm25 is not None and self.overlaps(name, time_range)
+        ]
+        count = sum(partition.bm25.count for _, partition in searched)
+        idf = {
+            term: float(bm25_idf(count, sum(partition.bm25.document_frequency(term) for _, partition in searched)))
+            for term in set(tokenize(query))
+        }
+
+        hits: List[Hit] = []
+        for name, partition in searched:
+            hits.extend((name, row, score) for row, score in partition.bm25.search(query, k, idf))
+        return hits
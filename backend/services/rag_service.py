@@ -1,134 +1,689 @@
 import os
 import asyncio
-from typing import List, Dict, Any
+import hashlib
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional, AsyncIterator, Callable, TYPE_CHECKING
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 import time
 
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
-import openai
-from sentence_transformers import SentenceTransformer
+import numpy as np
+
+from services.answer_cache import AnswerCache
+from services.bm25_index import reciprocal_rank_fusion
+from services.context_builder import ContextBuilder
+from services.embedding_backends import create_embeddings
+from services.index_store import IndexStore
+from services.llm_gateway import LLMGateway, LLMSaturated
+from services.metrics import ASK_STAGE_SECONDS, INGEST_STAGE_SECONDS, registry, timed
+from services.partitioned_index import (
+    PARTITIONS_DIR, Hit, PartitionedIndex, TimeRange, link_partition, partition_name
+)
+from services.query_batcher import QueryBatcher
+from services.vector_index import VectorIndex, VectorIndexWriter, parse_published
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
 
 logger = logging.getLogger(__name__)
 
+QUESTIONS = registry.counter("rag_questions_total", "Questions by endpoint and outcome", ["mode", "result"])
+CACHE_LOOKUPS = registry.counter("rag_answer_cache_lookups_total", "Answer cache lookups by layer", ["layer", "result"])
+QUERY_BATCH_SIZE = registry.histogram(
+    "rag_query_batch_size",
+    "Questions embedded, or searched, together",
+    ["stage"],
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+CONTEXT_TOKENS = registry.histogram(
+    "rag_context_tokens",
+    "Tokens of retrieved context sent to the LLM per question",
+    buckets=(128, 256, 512, 1024, 2048, 4096, 8192)
+)
+CONTEXT_TOKENS_SAVED = registry.counter("rag_context_tokens_saved_total", "Context tokens removed by merging, dedup and the token budget")
+LLM_REQUESTS = registry.counter("rag_llm_requests_total", "LLM completions by outcome (ok, error, saturated, mock)", ["result"])
+REBUILDS = registry.counter("rag_rebuilds_total", "Index rebuilds by mode and outcome", ["mode", "result"])
+REBUILD_CHUNKS = registry.counter("rag_rebuild_chunks_total", "Chunks added, removed and kept by rebuilds", ["action"])
+INDEX_CHUNKS = registry.gauge("rag_index_chunks", "Chunks in the loaded index snapshot")
+INDEX_PARTITIONS = registry.gauge("rag_index_partitions", "Time partitions in the loaded index snapshot")
+
+ID_MAP_FILE = "id_map.json"
+LEGACY_INDEX_PATH = "data/faiss_index"
+
+# Called with (stage, fraction of the stage done, message)
+ProgressCallback = Callable[[str, float, str], None]
+
 class RAGService:
     def __init__(self):
         self.embeddings = None
         self.vectorstore = None
         self.text_splitter = None
-        self.openai_client = None
-        self.embedding_model = None
+        self._loading = False
+        self.load_error = None
+        self.load_timings = {}
+        self.index_store = IndexStore(keep_versions=int(os.getenv("INDEX_KEEP_VERSIONS", "3")))
+        self.index_version = None
+        self.index_refresh_interval = float(os.getenv("INDEX_REFRESH_INTERVAL", "5"))
+        self._last_version_check = 0.0
+        self._reload_task = None
+        
+        # ANN index type, built into each snapshot, and its query-time knobs
+        self.index_type = os.getenv("INDEX_TYPE", "flat").lower()
+        self.index_nlist = int(os.getenv("INDEX_NLIST", "0"))
+        self.index_pq_m = int(os.getenv("INDEX_PQ_M", "0"))
+        self.index_hnsw_m = int(os.getenv("INDEX_HNSW_M", "32"))
+        self.index_nprobe = int(os.getenv("INDEX_NPROBE", "8"))
+        self.index_ef_search = int(os.getenv("INDEX_EF_SEARCH", "64"))
+        self.index_refine = int(os.getenv("INDEX_REFINE_FACTOR", "4"))
+        self.top_k = int(os.getenv("TOP_K_RESULTS", "5"))
+        
+        # Time partitioning, retention and recency scoring
+        self.partition_hours = int(os.getenv("INDEX_PARTITION_HOURS", "24"))
+        self.retention_days = float(os.getenv("INDEX_RETENTION_DAYS", "30"))
+        self.recency_weight = float(os.getenv("RECENCY_WEIGHT", "0.3"))
+        self.recency_half_life = float(os.getenv("RECENCY_HALF_LIFE_HOURS", "48")) * 3600
+        
+        # Hybrid retrieval: BM25 and vector candidates merged with reciprocal-rank fusion
+        self.hybrid_search = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+        self.hybrid_candidates = int(os.getenv("HYBRID_CANDIDATES", "20"))
+        self.rrf_k = int(os.getenv("RRF_K", "60"))
+        self._bm25_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bm25")
+        self.llm_model = os.getenv("LLM_MODEL", "gpt-4o-mini")
+        self.context_builder = ContextBuilder(self.llm_model)
+        self.llm_gateway = LLMGateway(self.llm_model)
+        self.embed_batch_size = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+        self.embed_workers = int(os.getenv("EMBED_WORKERS", "2"))
+        self._embed_executor = ThreadPoolExecutor(max_workers=self.embed_workers, thread_name_prefix="embed")
+        # Questions are embedded in one batch and searched in another, so the
+        # semantic cache can be checked in between
+        query_batch_size = int(os.getenv("QUERY_BATCH_SIZE", "16"))
+        query_batch_wait_ms = float(os.getenv("QUERY_BATCH_WAIT_MS", "5"))
+        self.embed_batcher = QueryBatcher(self._embed_questions, query_batch_size, query_batch_wait_ms)
+        self.query_batcher = QueryBatcher(self._search, query_batch_size, query_batch_wait_ms)
+        self.answer_cache = AnswerCache(
+            max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("ANSWER_CACHE_TTL", "900")),
+            similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+        )
         
     async def initialize(self):
-        """Initialize the RAG service components"""
+        """Load the embedding model and current index concurrently, then warm them up
+
+        Meant to run in the background of a worker that is already serving;
+        ``readiness()`` reports progress, per-stage timings and the outcome.
+        Failures leave the service degraded instead of raising.
+        """
+        self._loading = True
+        self.load_error = None
+        self.load_timings = {}
+        started = time.perf_counter()
         try:
-            # Initialize embeddings
-            logger.info("Loading embedding model...")
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name="BAAI/bge-small-en-v1.5",
-                model_kwargs={'device': 'cpu'},
-                encode_kwargs={'normalize_embeddings': True}
+            results = await asyncio.gather(
+                self._timed_load("models", asyncio.to_thread(self._load_models)),
+                self._timed_load("index", self._load_existing_index()),
+                return_exceptions=True
             )
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
             
-            # Initialize text splitter
-            self.text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
-                length_function=len,
-                separators=["\n\n", "\n", ". ", " ", ""]
-            )
-            
-            openai_api_key = os.getenv("OPENAI_API_KEY")
-            if not openai_api_key:
-                logger.warning("OPENAI_API_KEY not found, using mock responses")
-            else:
-                self.openai_client = openai.OpenAI(
-                    api_key=openai_api_key
-                )
-            
-            # Try to load existing index
-            await self._load_existing_index()
-            
-            logger.info("RAG service initialized successfully")
+            # First query pays for lazy allocations and cold index pages
+            await self._timed_load("warmup", asyncio.to_thread(self._warm_up))
+            logger.info(f"RAG service initialized in {time.perf_counter() - started:.2f}s")
             
         except Exception as e:
             logger.error(f"Failed to initialize RAG service: {e}")
-            raise
+            self.load_error = str(e)
+        finally:
+            self.load_timings["total"] = time.perf_counter() - started
+            self._loading = False
+    
+    async def _timed_load(self, stage: str, awaitable):
+        """Await one startup stage and record how long it took"""
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.load_timings[stage] = time.perf_counter() - start
+    
+    def _load_models(self):
+        """Import and construct the embedding model, text splitter and LLM client
+
+        The imports are deferred to here so a worker starts serving (and
+        reporting readiness) before torch and langchain are loaded.
+        """
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        
+        # Initialize embeddings
+        logger.info("Loading embedding model...")
+        self.embeddings = self._create_embeddings()
+        
+        self.context_builder.load()
+        
+        # Initialize text splitter
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200,
+            length_function=len,
+            separators=["\n\n", "\n", ". ", " ", ""]
+        )
+        
+        self.llm_gateway.load(os.getenv("OPENAI_API_KEY"), os.getenv("OPENAI_BASE_URL"))
+    
+    def _create_embeddings(self):
+        return create_embeddings()
+    
+    def _warm_up(self):
+        """Run a dummy query through the embedding model and, if loaded, the index"""
+        [(query_embedding, _)] = self._embed_questions(["warm up"])
+        if self.vectorstore is not None:
+            self._search([("warm up", (None, None), query_embedding)])
+    
+    @property
+    def status(self) -> str:
+        """loading until startup finishes, then ready, or degraded while answers would be mocked"""
+        if self._loading:
+            return "loading"
+        if self.embeddings is None or self.vectorstore is None or not self.llm_gateway.available:
+            return "degraded"
+        return "ready"
+    
+    def readiness(self) -> Dict[str, Any]:
+        """Startup status, what is missing and how long each startup stage took"""
+        return {
+            "status": self.status,
+            "checks": {
+                "embeddings": self.embeddings is not None,
+                "index": self.index_version,
+                "llm": "openai" if self.llm_gateway.available else "mock"
+            },
+            "llm_gateway": self.llm_gateway.stats(),
+            "timings": dict(self.load_timings),
+            "error": self.load_error
+        }
     
     async def _load_existing_index(self):
-        """Load existing FAISS index if available"""
+        """Load the current index snapshot if available"""
         try:
-            index_path = "data/faiss_index"
-            if os.path.exists(index_path):
-                logger.info("Loading existing FAISS index...")
-                self.vectorstore = FAISS.load_local(
-                    index_path, 
-                    self.embeddings,
-                    allow_dangerous_deserialization=True
+            version = self.index_store.current_version()
+            if version:
+                logger.info(f"Loading index version {version}...")
+                self.vectorstore = await asyncio.to_thread(
+                    PartitionedIndex.load,
+                    self.index_store.version_path(version)
+                )
+                self.index_version = version
+                self._update_index_gauges()
+                logger.info(
+                    f"Existing index loaded successfully ({len(self.vectorstore)} chunks "
+                    f"in {len(self.vectorstore.partitions)} partitions)"
+                )
+            elif os.path.exists(LEGACY_INDEX_PATH):
+                logger.warning(
+                    f"Found a legacy pickle index at {LEGACY_INDEX_PATH}; it is no longer loaded. "
+                    "Run a full rebuild to create a new index."
                 )
-                logger.info("Existing index loaded successfully")
             else:
                 logger.info("No existing index found")
         except Exception as e:
             logger.warning(f"Could not load existing index: {e}")
     
-    async def ask_question(self, question: str) -> Dict[str, Any]:
-        """Process a question using RAG"""
+    def _read_id_map(self, vectorstore: PartitionedIndex) -> Optional[Dict[str, Dict]]:
+        """Read the id map of the snapshot an index was loaded from"""
+        id_map_path = os.path.join(vectorstore.path, ID_MAP_FILE)
+        if not os.path.exists(id_map_path):
+            return None
+        with open(id_map_path) as f:
+            return json.load(f)
+    
+    def indexed_articles(self) -> List[Dict[str, str]]:
+        """URL, title and text of every article in the loaded snapshot, rebuilt from its chunks"""
+        vectorstore = self.vectorstore
+        id_map = self._read_id_map(vectorstore) if vectorstore is not None else None
+        if not id_map:
+            return []
+        
+        articles = []
+        for key, entry in id_map.items():
+            partition = vectorstore.partitions.get(entry["partition"])
+            if partition is None or not entry["rows"]:
+                continue
+            chunks = [partition.chunks.get(row) for row in entry["rows"]]
+            articles.append({
+                "url": chunks[0]["url"],
+                "title": chunks[0]["title"],
+                "content": " ".join(chunk["text"] for chunk in chunks)
+            })
+        return articles
+    
+    def _update_index_gauges(self):
+        """Export the size of the loaded snapshot"""
+        INDEX_CHUNKS.set(len(self.vectorstore))
+        INDEX_PARTITIONS.set(len(self.vectorstore.partitions))
+    
+    def _check_for_new_index(self):
+        """Start hot-swapping to a snapshot published by another worker, at most once per interval"""
+        now = time.monotonic()
+        if now - self._last_version_check < self.index_refresh_interval:
+            return
+        self._last_version_check = now
+        
+        version = self.index_store.current_version()
+        if version is None or version == self.index_version or self._reload_task is not None:
+            return
+        
+        self._reload_task = asyncio.create_task(self._reload_index(version))
+    
+    async def _reload_index(self, version: str):
+        """Load a newer snapshot in the background and swap it in"""
+        try:
+            logger.info(f"Loading index version {version}...")
+            vectorstore = await asyncio.to_thread(
+                PartitionedIndex.load,
+                self.index_store.version_path(version)
+            )
+            
+            # A local rebuild may have published an even newer version meanwhile
+            if self.index_store.current_version() == version:
+                self.vectorstore = vectorstore
+                self.index_version = version
+                self._update_index_gauges()
+                self.answer_cache.clear()
+                logger.info(f"Switched to index version {version}")
+        except Exception as e:
+            logger.warning(f"Could not load index version {version}: {e}")
+        finally:
+            self._reload_task = None
+    
+    async def ask_question(self, question: str, published_after: Optional[datetime] = None,
+                           published_before: Optional[datetime] = None) -> Dict[str, Any]:
+        """Process a question using RAG, optionally limited to articles published in a time range"""
         start_time = time.time()
+        time_range = self._time_range(published_after, published_before)
+        timings = {}
+        self._check_for_new_index()
         
         try:
             if not self.vectorstore:
                 # Return mock response if no index is available
+                QUESTIONS.inc(mode="ask", result="mock")
                 return self._get_mock_response(question)
             
-            # Retrieve relevant documents
-            docs = self.vectorstore.similarity_search(question, k=5)
+            generation = self.answer_cache.generation
+            cached, layer, query_embedding, docs = await self._retrieve(question, time_range, timings)
+            if cached:
+                QUESTIONS.inc(mode="ask", result="cached")
+                return self._with_timings(self._cached_response(cached, layer, start_time), timings, start_time)
             
             if not docs:
-                return {
-                    "answer": "I couldn't find any relevant information in the current news database. Please try rephrasing your question or check if the index has been built.",
-                    "citations": [],
-                    "processing_time": time.time() - start_time
-                }
+                QUESTIONS.inc(mode="ask", result="empty")
+                return self._with_timings(self._empty_response(start_time), timings, start_time)
             
             # Prepare context
-            context = "\n\n".join([doc.page_content for doc in docs])
+            with timed(ASK_STAGE_SECONDS, "context", timings):
+                context, context_stats = self._build_context(question, docs)
+                citations = self._format_citations(docs)
             
             # Generate answer
-            answer = await self._generate_answer(question, context)
-            
-            # Format citations
-            citations = []
-            for i, doc in enumerate(docs):
-                citations.append({
-                    "id": str(i + 1),
-                    "title": doc.metadata.get("title", "Unknown Title"),
-                    "url": doc.metadata.get("url", "#"),
-                    "snippet": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
-                    "timestamp": doc.metadata.get("published", datetime.now().isoformat()),
-                    "source": doc.metadata.get("source", "RSS Feed")
-                })
+            with timed(ASK_STAGE_SECONDS, "llm", timings):
+                answer, generated = await self._generate_answer(question, context, timings)
             
-            return {
+            processing_time = time.time() - start_time
+            # Fallback answers are not worth keeping once the LLM is back
+            if generated and time_range == (None, None):
+                self.answer_cache.put(
+                    question,
+                    query_embedding,
+                    {"answer": answer, "citations": citations},
+                    processing_time,
+                    generation
+                )
+            
+            QUESTIONS.inc(mode="ask", result="answered")
+            return self._with_timings({
                 "answer": answer,
                 "citations": citations,
-                "processing_time": time.time() - start_time
-            }
+                "processing_time": processing_time,
+                "cache": self._cache_info(None, 0.0),
+                "context": context_stats
+            }, timings, start_time)
             
         except Exception as e:
             logger.error(f"Error processing question: {e}")
+            QUESTIONS.inc(mode="ask", result="error")
             return self._get_mock_response(question)
     
-    async def _generate_answer(self, question: str, context: str) -> str:
-        """Generate answer using OpenAI GPT"""
+    async def stream_question(self, question: str, published_after: Optional[datetime] = None,
+                              published_before: Optional[datetime] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Process a question using RAG, yielding citations first and then answer tokens
+
+        Events are dicts with an ``event`` name (citations, token, done, error)
+        and a JSON-serializable ``data`` payload. A stream whose answer was cut
+        off by an LLM failure ends with an error event instead of done.
+        """
+        start_time = time.time()
+        time_range = self._time_range(published_after, published_before)
+        timings = {}
+        self._check_for_new_index()
+        
         try:
-            if not self.openai_client:
-                return self._generate_mock_answer(question, context)
+            if not self.vectorstore:
+                QUESTIONS.inc(mode="stream", result="mock")
+                mock = self._get_mock_response(question)
+                yield {"event": "citations", "data": mock["citations"]}
+                for token in self._tokenize_for_stream(mock["answer"]):
+                    yield {"event": "token", "data": token}
+                yield {"event": "done", "data": {"processing_time": time.time() - start_time, "cache": None}}
+                return
+            
+            generation = self.answer_cache.generation
+            cached, layer, query_embedding, docs = await self._retrieve(question, time_range, timings)
+            if cached:
+                QUESTIONS.inc(mode="stream", result="cached")
+                response = self._with_timings(self._cached_response(cached, layer, start_time), timings, start_time)
+                yield {"event": "citations", "data": response["citations"]}
+                for token in self._tokenize_for_stream(response["answer"]):
+                    yield {"event": "token", "data": token}
+                yield {"event": "done", "data": self._done_data(response)}
+                return
+            
+            if not docs:
+                QUESTIONS.inc(mode="stream", result="empty")
+                response = self._with_timings(self._empty_response(start_time), timings, start_time)
+                yield {"event": "citations", "data": []}
+                yield {"event": "token", "data": response["answer"]}
+                yield {"event": "done", "data": self._done_data(response)}
+                return
+            
+            # Citations are known as soon as retrieval finishes
+            with timed(ASK_STAGE_SECONDS, "context", timings):
+                citations = self._format_citations(docs)
+                context, context_stats = self._build_context(question, docs)
+            yield {"event": "citations", "data": citations}
+            
+            parts = []
+            outcome = {"generated": False, "error": None}
+            with timed(ASK_STAGE_SECONDS, "llm", timings):
+                async for token in self._stream_answer(question, context, timings, outcome):
+                    if not parts:
+                        # Time to first token, counted from the start of the request
+                        timings["first_token"] = time.time() - start_time
+                        ASK_STAGE_SECONDS.observe(timings["first_token"], stage="first_token")
+                    parts.append(token)
+                    yield {"event": "token", "data": token}
+            
+            if outcome["error"]:
+                # The client already has part of the answer; tell it the rest is not coming
+                QUESTIONS.inc(mode="stream", result="partial")
+                yield {"event": "error", "data": f"Answer interrupted: {outcome['error']}"}
+                return
+            
+            processing_time = time.time() - start_time
+            if outcome["generated"] and time_range == (None, None):
+                self.answer_cache.put(
+                    question,
+                    query_embedding,
+                    {"answer": "".join(parts).strip(), "citations": citations},
+                    processing_time,
+                    generation
+                )
+            QUESTIONS.inc(mode="stream", result="answered")
+            response = self._with_timings({
+                "processing_time": processing_time,
+                "cache": self._cache_info(None, 0.0),
+                "context": context_stats
+            }, timings, start_time)
+            yield {"event": "done", "data": self._done_data(response)}
             
-            prompt = f"""Based on the following news articles, provide a comprehensive and accurate answer to the question. Use specific information from the sources and maintain a professional news tone.
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            QUESTIONS.inc(mode="stream", result="error")
+            yield {"event": "error", "data": str(e)}
+    
+    async def _retrieve(self, question: str, time_range: TimeRange,
+                        timings: Dict[str, float]) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[List[float]], List["Document"]]:
+        """Look up the answer cache and retrieve documents for a question
+
+        Returns the cache entry and layer on a hit, otherwise the query embedding
+        and retrieved documents. Time-limited questions bypass the cache. Stage
+        durations are added to ``timings``.
+        """
+        cacheable = time_range == (None, None)
+        
+        # Exact-match cache layer
+        if cacheable:
+            with timed(ASK_STAGE_SECONDS, "cache_exact", timings):
+                cached = self.answer_cache.get_exact(question)
+            CACHE_LOOKUPS.inc(layer="exact", result="hit" if cached else "miss")
+            if cached:
+                return cached, "exact", None, []
+        
+        # Embed the question, batched with other concurrent questions
+        submitted = time.perf_counter()
+        query_embedding, embed_timings = await self.embed_batcher.submit(question)
+        timings.update(embed_timings)
+        queue_wait = max(time.perf_counter() - submitted - embed_timings["embed"], 0.0)
+        
+        # Semantic cache layer, checked before any index search
+        if cacheable:
+            with timed(ASK_STAGE_SECONDS, "cache_semantic", timings):
+                cached = self.answer_cache.get_semantic(query_embedding)
+            CACHE_LOOKUPS.inc(layer="semantic", result="hit" if cached else "miss")
+            if cached:
+                self._record_queue_wait(timings, queue_wait)
+                return cached, "semantic", query_embedding, []
+        
+        # Retrieve relevant documents, batched with other cache misses
+        submitted = time.perf_counter()
+        docs, search_timings = await self.query_batcher.submit((question, time_range, query_embedding))
+        timings.update(search_timings)
+        queue_wait += max(time.perf_counter() - submitted - search_timings["search"], 0.0)
+        self._record_queue_wait(timings, queue_wait)
+        
+        timings["retrieval"] = embed_timings["embed"] + search_timings["search"]
+        ASK_STAGE_SECONDS.observe(timings["retrieval"], stage="retrieval")
+        return None, None, query_embedding, docs
+    
+    def _record_queue_wait(self, timings: Dict[str, float], queue_wait: float):
+        """Time a question spent waiting for its embedding and search batches"""
+        ASK_STAGE_SECONDS.observe(queue_wait, stage="queue_wait")
+        timings["queue_wait"] = queue_wait
+    
+    def _embed_questions(self, questions: List[str]) -> List[Tuple[List[float], Dict[str, float]]]:
+        """Embed a batch of questions in one forward pass"""
+        timings = {}
+        QUERY_BATCH_SIZE.observe(len(questions), stage="embed")
+        with timed(ASK_STAGE_SECONDS, "embed", timings):
+            query_embeddings = self.embeddings.embed_documents(questions)
+        return [(query_embedding, dict(timings)) for query_embedding in query_embeddings]
+    
+    def _search(self, queries: List[Tuple[str, TimeRange, List[float]]]) -> List[Tuple[List["Document"], Dict[str, float]]]:
+        """Search each partition once for a batch of embedded questions
+
+        Only partitions overlapping a question's time range and the retention
+        window are searched. With hybrid search on, the BM25 lookups run on their
+        own thread during the vector search, and both candidate lists are fused
+        per question. Every question gets the batch's stage timings, with
+        ``search`` covering the whole batch.
+        """
+        batch_start = time.perf_counter()
+        timings = {}
+        QUERY_BATCH_SIZE.observe(len(queries), stage="search")
+        vectorstore = self.vectorstore
+        questions = [question for question, _, _ in queries]
+        query_embeddings = [query_embedding for _, _, query_embedding in queries]
+        now = time.time()
+        ranges = [self._search_range(time_range, now) for _, time_range, _ in queries]
+        k = max(self.top_k, self.hybrid_candidates) if self.hybrid_search else self.top_k
+        
+        def search_keywords():
+            with timed(ASK_STAGE_SECONDS, "keyword_search", timings):
+                return [vectorstore.keyword_search(question, k, time_range) for question, time_range in zip(questions, ranges)]
+        
+        if self.hybrid_search:
+            keyword_search = self._bm25_executor.submit(search_keywords)
+        
+        with timed(ASK_STAGE_SECONDS, "vector_search", timings):
+            vector_hits = vectorstore.search(
+                np.array(query_embeddings, dtype=np.float32),
+                k,
+                ranges,
+                nprobe=self.index_nprobe,
+                ef_search=self.index_ef_search,
+                refine=self.index_refine
+            )
+        keyword_hits = keyword_search.result() if self.hybrid_search else None
+        
+        results = []
+        with timed(ASK_STAGE_SECONDS, "rank", timings):
+            for i in range(len(queries)):
+                ranking = self._rank_hits(vectorstore, vector_hits[i], ranges[i], now, k)
+                if keyword_hits is not None:
+                    keyword_ranking = self._rank_hits(vectorstore, keyword_hits[i], ranges[i], now, k)
+                    ranking = reciprocal_rank_fusion([ranking, keyword_ranking], self.top_k, self.rrf_k)
+                # Only the chunks actually returned are read from the chunk store
+                docs = [
+                    self._to_document(vectorstore.partitions[name].chunks.get(row))
+                    for name, row in ranking[:self.top_k]
+                ]
+                results.append(docs)
+        
+        timings["search"] = time.perf_counter() - batch_start
+        return [(docs, dict(timings)) for docs in results]
+    
+    def _with_timings(self, response: Dict[str, Any], timings: Dict[str, float], start_time: float) -> Dict[str, Any]:
+        """Attach the per-stage timing breakdown, including the total, to a response"""
+        timings["total"] = time.time() - start_time
+        ASK_STAGE_SECONDS.observe(timings["total"], stage="total")
+        response["timings"] = timings
+        return response
+    
+    def _done_data(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Payload of the final stream event"""
+        return {
+            "processing_time": response["processing_time"],
+            "cache": response["cache"],
+            "timings": response["timings"],
+            "context": response.get("context")
+        }
+    
+    def _build_context(self, question: str, docs: List["Document"]) -> Tuple[str, Dict[str, int]]:
+        """Assemble the prompt context and record its size and the tokens saved"""
+        context, stats = self.context_builder.build(question, docs)
+        CONTEXT_TOKENS.observe(stats["tokens"])
+        CONTEXT_TOKENS_SAVED.inc(stats["tokens_saved"])
+        return context, stats
+    
+    def _rank_hits(self, vectorstore: PartitionedIndex, hits: List[Hit], time_range: TimeRange, now: float,
+                   k: int) -> List[Tuple[str, int]]:
+        """Drop hits outside the time range and rank the rest by score blended with recency
+
+        The score is scaled by ``(1 - w) + w * 0.5 ** (age / half_life)``, so a
+        fresh chunk keeps its full score and an old one keeps ``1 - w`` of it.
+        Publication times come from each partition's published column, so no
+        chunk is decoded here.
+        """
+        ranked = []
+        for name, row, score in hits:
+            published = float(vectorstore.partitions[name].published[row])
+            if np.isnan(published):
+                published = vectorstore.bounds(name)[0]
+            if (time_range[0] is not None and published < time_range[0]) or \
+               (time_range[1] is not None and published > time_range[1]):
+                continue
+            
+            recency = 0.5 ** (max(now - published, 0.0) / self.recency_half_life) if self.recency_half_life > 0 else 1.0
+            ranked.append((score * (1.0 - self.recency_weight + self.recency_weight * recency), (name, row)))
+        
+        ranked.sort(key=lambda hit: hit[0], reverse=True)
+        return [hit for _, hit in ranked[:k]]
+    
+    def _time_range(self, published_after: Optional[datetime], published_before: Optional[datetime]) -> TimeRange:
+        """Turn request datetimes into epoch seconds, treating naive ones as UTC"""
+        def to_epoch(value: Optional[datetime]) -> Optional[float]:
+            if value is None:
+                return None
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            return value.timestamp()
+        
+        return to_epoch(published_after), to_epoch(published_before)
+    
+    def _search_range(self, time_range: TimeRange, now: float) -> TimeRange:
+        """Clamp a time range to the retention window"""
+        start, end = time_range
+        retention_start = self._retention_start(now)
+        if retention_start is not None:
+            start = max(start, retention_start) if start is not None else retention_start
+        return start, end
+    
+    def _retention_start(self, now: float) -> Optional[float]:
+        """Oldest publication time kept in the index, or None to keep everything"""
+        return now - self.retention_days * 86400 if self.retention_days > 0 else None
+    
+    def _to_document(self, chunk: Dict[str, str]) -> "Document":
+        """Turn a chunk store row into a Document"""
+        from langchain.schema import Document
+        
+        return Document(
+            page_content=chunk["text"],
+            metadata={
+                "title": chunk["title"],
+                "url": chunk["url"],
+                "published": chunk["published"],
+                "source": chunk["source"],
+                "alternates": chunk.get("alternates", "")
+            }
+        )
+    
+    def _format_citations(self, docs: List["Document"]) -> List[Dict[str, Any]]:
+        """Format retrieved documents as citations"""
+        citations = []
+        for i, doc in enumerate(docs):
+            citations.append({
+                "id": str(i + 1),
+                "title": doc.metadata.get("title", "Unknown Title"),
+                "url": doc.metadata.get("url", "#"),
+                "snippet": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
+                "timestamp": doc.metadata.get("published", datetime.now().isoformat()),
+                "source": doc.metadata.get("source", "RSS Feed"),
+                "alternate_sources": json.loads(doc.metadata["alternates"]) if doc.metadata.get("alternates") else None
+            })
+        return citations
+    
+    def _empty_response(self, start_time: float) -> Dict[str, Any]:
+        """Response when retrieval finds nothing"""
+        return {
+            "answer": "I couldn't find any relevant information in the current news database. Please try rephrasing your question or check if the index has been built.",
+            "citations": [],
+            "processing_time": time.time() - start_time,
+            "cache": self._cache_info(None, 0.0)
+        }
+    
+    def _cached_response(self, entry: Dict[str, Any], layer: str, start_time: float) -> Dict[str, Any]:
+        """Build a response from a cache entry"""
+        processing_time = time.time() - start_time
+        return {
+            **entry["result"],
+            "processing_time": processing_time,
+            "cache": self._cache_info(layer, max(entry["cost"] - processing_time, 0.0))
+        }
+    
+    def _cache_info(self, layer: Any, saved_time: float) -> Dict[str, Any]:
+        """Cache layer that answered, hit ratio so far and latency saved"""
+        stats = self.answer_cache.stats()
+        return {
+            "hit": layer,
+            "hit_ratio": stats["hit_ratio"],
+            "saved_time": saved_time,
+            "total_saved_time": stats["total_saved_time"]
+        }
+    
+    def _build_messages(self, question: str, context: str) -> List[Dict[str, str]]:
+        """Build the chat messages for answering a question from context"""
+        prompt = f"""Based on the following news articles, provide a comprehensive and accurate answer to the question. Use specific information from the sources and maintain a professional news tone.
 
 Question: {question}
 
@@ -143,22 +698,67 @@ Instructions:
 
 Answer:"""
 
-            response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a professional news analyst providing accurate, well-sourced answers based on current news articles."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.3
-            )
+        return [
+            {"role": "system", "content": "You are a professional news analyst providing accurate, well-sourced answers based on current news articles."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    async def _generate_answer(self, question: str, context: str, timings: Dict[str, float]) -> Tuple[str, bool]:
+        """Generate answer using OpenAI GPT, and whether it came from the LLM rather than the mock fallback"""
+        try:
+            if not self.llm_gateway.available:
+                LLM_REQUESTS.inc(result="mock")
+                return self._generate_mock_answer(question, context), False
             
-            return response.choices[0].message.content.strip()
+            answer = await self.llm_gateway.complete(self._build_messages(question, context), timings)
+            LLM_REQUESTS.inc(result="ok")
+            return answer, True
             
+        except LLMSaturated as e:
+            logger.warning(f"LLM saturated, answering with the mock response: {e}")
+            LLM_REQUESTS.inc(result="saturated")
+            return self._generate_mock_answer(question, context), False
         except Exception as e:
             logger.error(f"Error generating answer with OpenAI: {e}")
-            return self._generate_mock_answer(question, context)
+            LLM_REQUESTS.inc(result="error")
+            return self._generate_mock_answer(question, context), False
+    
+    async def _stream_answer(self, question: str, context: str, timings: Dict[str, float],
+                             outcome: Dict[str, bool]) -> AsyncIterator[str]:
+        """Stream answer tokens from OpenAI GPT, or the mock answer word by word
+
+        ``outcome["generated"]`` is set once the LLM has streamed the whole answer,
+        and ``outcome["error"]`` if it failed after some tokens were already sent.
+        """
+        if self.llm_gateway.available:
+            streamed = False
+            try:
+                async for token in self.llm_gateway.stream(self._build_messages(question, context), timings):
+                    streamed = True
+                    yield token
+                LLM_REQUESTS.inc(result="ok")
+                outcome["generated"] = True
+                return
+                
+            except LLMSaturated as e:
+                logger.warning(f"LLM saturated, streaming the mock response: {e}")
+                LLM_REQUESTS.inc(result="saturated")
+            except Exception as e:
+                logger.error(f"Error streaming answer with OpenAI: {e}")
+                LLM_REQUESTS.inc(result="error")
+                if streamed:
+                    outcome["error"] = str(e) or type(e).__name__
+                    return
+        else:
+            LLM_REQUESTS.inc(result="mock")
+        
+        for token in self._tokenize_for_stream(self._generate_mock_answer(question, context)):
+            yield token
+            await asyncio.sleep(0)
+    
+    def _tokenize_for_stream(self, text: str) -> List[str]:
+        """Split a complete answer into word tokens for streaming"""
+        return re.findall(r"\S+\s*", text)
     
     def _generate_mock_answer(self, question: str, context: str) -> str:
         """Generate a mock answer when API is not available"""
@@ -181,47 +781,351 @@ Answer:"""
             "processing_time": 0.1
         }
     
-    async def rebuild_index(self, articles: List[Dict]) -> Dict[str, int]:
-        """Rebuild the FAISS index with new articles"""
+    async def rebuild_index(self, articles: List[Dict], incremental: bool = True,
+                            progress_callback: Optional[ProgressCallback] = None) -> Dict[str, int]:
+        """Rebuild the time-partitioned index with new articles
+
+        Articles go into one partition per INDEX_PARTITION_HOURS bucket of their
+        publication time, and partitions older than the retention window are
+        dropped whole. In incremental mode fetched articles are upserted: new or
+        changed ones are embedded, and everything else is kept until its partition
+        expires. Untouched partitions are hard-linked into the new snapshot, and
+        only partitions with changes are rewritten. Full mode indexes only the
+        fetched articles, and is used whenever there is no index or id map to diff
+        against. The new snapshot is built off to the side and swapped in once
+        complete, so queries keep being served from the previous one in the meantime.
+        """
         try:
             logger.info(f"Rebuilding index with {len(articles)} articles...")
+            self._report(progress_callback, "splitting", 0.0, f"Splitting {len(articles)} articles...")
             
-            # Process articles into documents
-            documents = []
+            # Key every article by URL and content hash, and bucket it by publication time
+            now = time.time()
+            retention_start = self._retention_start(now)
+            keyed_articles = {}
+            too_old = 0
             for article in articles:
-                # Split article content into chunks
-                chunks = self.text_splitter.split_text(article.get("content", ""))
-                
-                for chunk in chunks:
-                    doc = Document(
-                        page_content=chunk,
-                        metadata={
-                            "title": article.get("title", ""),
-                            "url": article.get("url", ""),
-                            "published": article.get("published", ""),
-                            "source": article.get("source", "RSS Feed")
-                        }
-                    )
-                    documents.append(doc)
-            
-            if not documents:
+                key = self._article_key(article)
+                if key in keyed_articles:
+                    continue
+                content_hash = self._content_hash(article)
+                published = parse_published(article.get("published", ""))
+                if published is None:
+                    # Stamped after hashing, so an undated article stays unchanged across
+                    # rebuilds and keeps the partition it was first indexed into
+                    published = now
+                    article = {**article, "published": datetime.fromtimestamp(now, timezone.utc).isoformat()}
+                if retention_start is not None and published < retention_start:
+                    too_old += 1
+                    continue
+                keyed_articles[key] = (
+                    content_hash,
+                    article,
+                    partition_name(published, self.partition_hours)
+                )
+            if too_old:
+                logger.info(f"Skipped {too_old} articles older than the {self.retention_days:g} day retention window")
+            
+            current = self.vectorstore
+            current_id_map = None
+            if incremental and current is not None and current.partition_hours == self.partition_hours:
+                current_id_map = await asyncio.to_thread(self._read_id_map, current)
+            if incremental and current_id_map is None:
+                logger.info("No compatible index or id map, falling back to full rebuild")
+                incremental = False
+            
+            with timed(INGEST_STAGE_SECONDS, "split"):
+                documents, doc_keys, kept, reused, id_map, stale, expired = await asyncio.to_thread(
+                    self._plan_delta,
+                    keyed_articles,
+                    current_id_map or {},
+                    current,
+                    retention_start
+                )
+            # Rows of reused partitions are already in the id map, kept rows of rewritten ones are not yet
+            unchanged = sum(len(entry["rows"]) for entry in id_map.values()) + \
+                sum(len(rows) for partition_kept in kept.values() for _, rows in partition_kept)
+            # A full rebuild replaces every chunk of the current snapshot
+            replaced = len(current) if not incremental and current is not None else 0
+            
+            if not documents and unchanged == 0:
                 raise ValueError("No documents to process")
             
-            # Create new FAISS index
-            logger.info(f"Creating FAISS index with {len(documents)} chunks...")
-            self.vectorstore = FAISS.from_documents(documents, self.embeddings)
+            self._report(progress_callback, "splitting", 1.0, f"Split into {len(documents)} chunks to embed")
+            logger.info(
+                f"{'Incremental' if incremental else 'Full'} rebuild: {len(documents)} chunks to embed, "
+                f"{stale} stale and {expired} expired chunks to drop, {unchanged} unchanged, "
+                f"{len(reused)} partitions reused"
+            )
             
-            # Save the index
-            os.makedirs("data", exist_ok=True)
-            self.vectorstore.save_local("data/faiss_index")
+            if documents or stale or expired:
+                staging_path = await asyncio.to_thread(self.index_store.begin)
+                writers = {}
+                try:
+                    for name in reused:
+                        await asyncio.to_thread(
+                            link_partition,
+                            current.partition_path(name),
+                            os.path.join(staging_path, PARTITIONS_DIR, name)
+                        )
+                    
+                    partitions = set(kept) | {id_map[key]["partition"] for key in doc_keys}
+                    for name in sorted(partitions):
+                        writers[name] = VectorIndexWriter(
+                            os.path.join(staging_path, PARTITIONS_DIR, name),
+                            index_type=self.index_type,
+                            nlist=self.index_nlist,
+                            pq_m=self.index_pq_m,
+                            hnsw_m=self.index_hnsw_m
+                        )
+                    for name, partition_kept in kept.items():
+                        await asyncio.to_thread(self._copy_rows, current.partitions[name], writers, partition_kept, id_map)
+                    with timed(INGEST_STAGE_SECONDS, "embed"):
+                        await self._embed_into(writers, documents, doc_keys, id_map, progress_callback)
+                    
+                    # Save the index
+                    self._report(progress_callback, "saving", 0.0, "Saving index...")
+                    with timed(INGEST_STAGE_SECONDS, "save"):
+                        await asyncio.to_thread(self._write_snapshot, staging_path, writers, reused, current, id_map)
+                        version = await asyncio.to_thread(self.index_store.commit, staging_path)
+                except Exception:
+                    await asyncio.to_thread(self.index_store.abort, staging_path)
+                    raise
+                
+                # Swap in the new index
+                self.vectorstore = await asyncio.to_thread(
+                    PartitionedIndex.load,
+                    self.index_store.version_path(version)
+                )
+                self.index_version = version
+                self._update_index_gauges()
+                self.answer_cache.clear()
             
+            self._report(progress_callback, "saving", 1.0, "Index saved")
             logger.info("Index rebuilt and saved successfully")
             
+            REBUILDS.inc(mode="incremental" if incremental else "full", result="ok")
+            REBUILD_CHUNKS.inc(len(documents), action="added")
+            REBUILD_CHUNKS.inc(stale + expired + replaced, action="removed")
+            REBUILD_CHUNKS.inc(unchanged, action="unchanged")
+            
             return {
-                "articles": len(articles),
-                "chunks": len(documents)
+                "articles": len(id_map),
+                "chunks": len(documents) + unchanged,
+                "added": len(documents),
+                "removed": stale + expired + replaced,
+                "unchanged": unchanged,
+                "expired": expired,
+                "partitions": len(self.vectorstore.partitions)
             }
             
         except Exception as e:
             logger.error(f"Error rebuilding index: {e}")
+            REBUILDS.inc(mode="incremental" if incremental else "full", result="error")
             raise
+    
+    def _plan_delta(self, keyed_articles: Dict[str, tuple], current_id_map: Dict[str, Dict],
+                    current: Optional[PartitionedIndex], retention_start: Optional[float]) -> tuple:
+        """Work out which chunks to embed, which partitions to reuse or rewrite and how many rows to drop
+
+        Returns the documents to embed with the article key of each, the
+        (key, rows) pairs to copy per rewritten partition, the partitions to
+        reuse as they are, the id map for the new snapshot (rows of rewritten
+        partitions filled in while writing), and the number of stale and expired
+        rows.
+        """
+        documents = []
+        doc_keys = []
+        id_map = {}
+        stale = 0
+        expired = 0
+        dirty = set()
+        
+        def live(partition: str) -> bool:
+            return retention_start is None or current.bounds(partition)[1] > retention_start
+        
+        for key, (content_hash, article, partition) in keyed_articles.items():
+            existing = current_id_map.get(key)
+            if existing and live(existing["partition"]):
+                if existing["hash"] == content_hash:
+                    continue
+                stale += len(existing["rows"])
+                dirty.add(existing["partition"])
+            elif existing:
+                expired += len(existing["rows"])
+            
+            id_map[key] = {"hash": content_hash, "partition": partition, "rows": []}
+            article_docs = self._build_documents(article)
+            documents.extend(article_docs)
+            doc_keys.extend([key] * len(article_docs))
+            dirty.add(partition)
+        
+        # Everything not re-embedded stays until its partition expires
+        kept = {}
+        for key, entry in current_id_map.items():
+            if key in id_map:
+                continue
+            if not live(entry["partition"]):
+                expired += len(entry["rows"])
+            elif entry["partition"] in dirty:
+                kept.setdefault(entry["partition"], []).append((key, entry["rows"]))
+                id_map[key] = {"hash": entry["hash"], "partition": entry["partition"], "rows": []}
+            else:
+                id_map[key] = entry
+        
+        # Partitions without changes are linked into the new snapshot as they are
+        reused = []
+        if current_id_map:
+            reused = [name for name in current.partitions if live(name) and name not in dirty]
+        
+        return documents, doc_keys, kept, reused, id_map, stale, expired
+    
+    def _copy_rows(self, current: VectorIndex, writers: Dict[str, VectorIndexWriter],
+                   kept: List[Tuple[str, List[int]]], id_map: Dict[str, Dict]):
+        """Copy vectors and chunks of unchanged articles of one partition into the new snapshot"""
+        rows = []
+        keys = []
+        for key, article_rows in kept:
+            rows.extend(article_rows)
+            keys.extend([key] * len(article_rows))
+        
+        for start in range(0, len(rows), self.embed_batch_size):
+            batch_rows = rows[start:start + self.embed_batch_size]
+            self._append(
+                writers,
+                current.vectors(batch_rows),
+                [current.chunks.get(row) for row in batch_rows],
+                keys[start:start + self.embed_batch_size],
+                id_map
+            )
+    
+    async def _embed_into(self, writers: Dict[str, VectorIndexWriter], documents: List["Document"], doc_keys: List[str],
+                          id_map: Dict[str, Dict], progress_callback: Optional[ProgressCallback]):
+        """Embed documents in fixed-size batches on the worker pool and add each batch to its partitions
+
+        At most ``embed_workers * 2`` batches are in flight, so only a bounded
+        number of vectors is held in memory outside the index.
+        """
+        loop = asyncio.get_running_loop()
+        max_in_flight = self.embed_workers * 2
+        total = len(documents)
+        embedded = 0
+        
+        def embed_texts(texts: List[str]) -> List[List[float]]:
+            with timed(INGEST_STAGE_SECONDS, "embed_batch"):
+                return self.embeddings.embed_documents(texts)
+        
+        async def embed_batch(batch_docs: List["Document"], batch_keys: List[str]):
+            vectors = await loop.run_in_executor(
+                self._embed_executor,
+                embed_texts,
+                [doc.page_content for doc in batch_docs]
+            )
+            return batch_docs, batch_keys, vectors
+        
+        async def collect(pending: set) -> set:
+            nonlocal embedded
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                batch_docs, batch_keys, vectors = task.result()
+                await asyncio.to_thread(
+                    self._append,
+                    writers,
+                    np.array(vectors, dtype=np.float32),
+                    [{"text": doc.page_content, **doc.metadata} for doc in batch_docs],
+                    batch_keys,
+                    id_map
+                )
+                embedded += len(batch_docs)
+                self._report(progress_callback, "embedding", embedded / total, f"Embedded {embedded}/{total} chunks")
+            return pending
+        
+        pending = set()
+        try:
+            for start in range(0, total, self.embed_batch_size):
+                pending.add(asyncio.create_task(embed_batch(
+                    documents[start:start + self.embed_batch_size],
+                    doc_keys[start:start + self.embed_batch_size]
+                )))
+                if len(pending) >= max_in_flight:
+                    pending = await collect(pending)
+            while pending:
+                pending = await collect(pending)
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def _append(self, writers: Dict[str, VectorIndexWriter], vectors: np.ndarray, chunks: List[Dict[str, str]],
+                keys: List[str], id_map: Dict[str, Dict]):
+        """Add a batch to the partitions its articles belong to and record the assigned rows in the id map"""
+        by_partition = {}
+        for i, key in enumerate(keys):
+            by_partition.setdefault(id_map[key]["partition"], []).append(i)
+        
+        for name, indices in by_partition.items():
+            rows = writers[name].add(vectors[indices], [chunks[i] for i in indices])
+            for i, row in zip(indices, rows):
+                id_map[keys[i]]["rows"].append(row)
+    
+    def _write_snapshot(self, staging_path: str, writers: Dict[str, VectorIndexWriter], reused: List[str],
+                        current: Optional[PartitionedIndex], id_map: Dict[str, Dict]):
+        """Finish writing the partitions, partition list and id map of a staged snapshot"""
+        counts = {name: len(current.partitions[name]) for name in reused}
+        for name, writer in writers.items():
+            if len(writer) == 0:
+                # Every article moved out of this partition
+                writer.discard()
+                continue
+            writer.close()
+            counts[name] = len(writer)
+        
+        PartitionedIndex.write_meta(staging_path, self.partition_hours, counts)
+        with open(os.path.join(staging_path, ID_MAP_FILE), "w") as f:
+            json.dump(id_map, f)
+    
+    def _report(self, progress_callback: Optional[ProgressCallback], stage: str, fraction: float, message: str):
+        """Report rebuild progress if someone is listening"""
+        if progress_callback:
+            progress_callback(stage, fraction, message)
+    
+    def _build_documents(self, article: Dict) -> List["Document"]:
+        """Split an article into chunk documents"""
+        from langchain.schema import Document
+        
+        # Split article content into chunks
+        chunks = self.text_splitter.split_text(article.get("content", ""))
+        
+        # Other outlets carrying the same story, collapsed by the dedup stage
+        alternates = json.dumps(article["alternate_sources"]) if article.get("alternate_sources") else ""
+        
+        documents = []
+        for chunk in chunks:
+            doc = Document(
+                page_content=chunk,
+                metadata={
+                    "title": article.get("title", ""),
+                    "url": article.get("url", ""),
+                    "published": article.get("published", ""),
+                    "source": article.get("source", "RSS Feed"),
+                    "alternates": alternates
+                }
+            )
+            documents.append(doc)
+        
+        return documents
+    
+    def _article_key(self, article: Dict) -> str:
+        """Key an article by URL, falling back to its title"""
+        return article.get("url") or article.get("title", "")
+    
+    def _content_hash(self, article: Dict) -> str:
+        """Hash everything that ends up in an article's chunks"""
+        digest = hashlib.sha256()
+        for field in ("title", "content", "published", "source"):
+            digest.update(str(article.get(field, "")).encode("utf-8"))
+            digest.update(b"\0")
+        
+        # Only hashed when present, so articles without duplicates keep their hash
+        if article.get("alternate_sources"):
+            digest.update(json.dumps(article["alternate_sources"], sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
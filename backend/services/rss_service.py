@@ -1,16 +1,27 @@
-import feedparser
-import requests
-from typing import List, Dict
+import httpx
+from typing import Callable, List, Dict, Optional
 import logging
-from datetime import datetime
 import asyncio
-from bs4 import BeautifulSoup
-import re
+import hashlib
+import os
+import time
+from urllib.parse import urlparse
+
+from services.feed_cache import FeedCache
+from services.feed_parser import FeedParserPool
+from services.metrics import INGEST_STAGE_SECONDS, registry, timed
 
 logger = logging.getLogger(__name__)
 
+FEED_FETCH_SECONDS = registry.histogram("rss_feed_fetch_seconds", "Time to fetch and parse one feed", ["feed"])
+FEED_FETCHES = registry.counter(
+    "rss_feed_fetches_total",
+    "Feed fetches by outcome (fetched, not_modified, unchanged, error, timeout)",
+    ["feed", "result"]
+)
+
 class RSSService:
-    def __init__(self):
+    def __init__(self, feed_cache: Optional[FeedCache] = None):
         self.rss_sources = [
             "https://feeds.reuters.com/reuters/topNews",
             "https://rss.cnn.com/rss/edition.rss",
@@ -21,106 +32,164 @@ class RSSService:
             "https://feeds.abcnews.go.com/abcnews/topstories",
             "https://feeds.foxnews.com/foxnews/latest"
         ]
+        
+        # Fetch limits
+        self.max_concurrency = int(os.getenv("RSS_MAX_CONCURRENCY", "16"))
+        self.per_host_concurrency = int(os.getenv("RSS_PER_HOST_CONCURRENCY", "2"))
+        self.host_delay = float(os.getenv("RSS_HOST_DELAY", "1.0"))
+        self.feed_timeout = float(os.getenv("RSS_FEED_TIMEOUT", "30"))
+        
+        self._client: Optional[httpx.AsyncClient] = None
+        self._global_limit = asyncio.Semaphore(self.max_concurrency)
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._host_last_request: Dict[str, float] = {}
+        
+        # Conditional GET validators and parsed articles per feed
+        self.feed_cache = feed_cache or FeedCache()
+        
+        # Feed parsing and HTML cleaning run on worker processes, off the event loop
+        self.parser_pool = FeedParserPool()
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.feed_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                ),
+                follow_redirects=True,
+                headers={"User-Agent": "RAG-News-Assistant/1.0"}
+            )
+        return self._client
+    
+    async def close(self):
+        """Close the pooled HTTP client and stop the parser processes"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self.parser_pool.close()
     
     async def get_sources(self) -> List[str]:
         """Get list of RSS sources"""
         return self.rss_sources
     
-    async def fetch_all_articles(self) -> List[Dict]:
-        """Fetch articles from all RSS sources"""
-        all_articles = []
+    async def fetch_all_articles(self, progress_callback: Optional[Callable[[str, float, str], None]] = None) -> List[Dict]:
+        """Fetch articles from all RSS sources concurrently"""
+        results = await self.fetch_feeds(self.rss_sources, progress_callback)
         
-        for source_url in self.rss_sources:
-            try:
-                logger.info(f"Fetching from: {source_url}")
-                articles = await self._fetch_rss_feed(source_url)
-                all_articles.extend(articles)
-                logger.info(f"Fetched {len(articles)} articles from {source_url}")
-                
-                # Add delay to be respectful to servers
-                await asyncio.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"Error fetching from {source_url}: {e}")
-                continue
+        all_articles = []
+        for articles in results.values():
+            all_articles.extend(articles)
         
         logger.info(f"Total articles fetched: {len(all_articles)}")
         return all_articles
     
+    async def fetch_feeds(self, urls: List[str],
+                          progress_callback: Optional[Callable[[str, float, str], None]] = None) -> Dict[str, List[Dict]]:
+        """Fetch the given feeds concurrently, returning the articles of each (empty on errors)"""
+        total = len(urls)
+        done = 0
+        
+        async def fetch_and_report(source_url: str) -> List[Dict]:
+            nonlocal done
+            articles = await self._fetch_source(source_url)
+            done += 1
+            if progress_callback:
+                progress_callback("fetching", done / total, f"Fetched {done}/{total} feeds")
+            return articles
+        
+        with timed(INGEST_STAGE_SECONDS, "fetch"):
+            results = await asyncio.gather(
+                *(fetch_and_report(source_url) for source_url in urls)
+            )
+        
+        try:
+            self.feed_cache.save()
+        except Exception as e:
+            logger.warning(f"Could not save feed cache: {e}")
+        
+        return dict(zip(urls, results))
+    
+    async def _fetch_source(self, source_url: str) -> List[Dict]:
+        """Fetch one source within the global and per-host limits"""
+        host = urlparse(source_url).netloc
+        host_limit = self._host_limits.setdefault(host, asyncio.Semaphore(self.per_host_concurrency))
+        
+        try:
+            async with host_limit:
+                await self._wait_for_host(host)
+                async with self._global_limit:
+                    logger.info(f"Fetching from: {source_url}")
+                    with FEED_FETCH_SECONDS.time(feed=host):
+                        articles = await asyncio.wait_for(
+                            self._fetch_rss_feed(source_url),
+                            timeout=self.feed_timeout
+                        )
+                    logger.info(f"Fetched {len(articles)} articles from {source_url}")
+                    return articles
+                
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out fetching from {source_url} after {self.feed_timeout}s")
+            FEED_FETCHES.inc(feed=host, result="timeout")
+            return []
+        except Exception as e:
+            logger.error(f"Error fetching from {source_url}: {e}")
+            return []
+    
+    async def _wait_for_host(self, host: str):
+        """Space out request starts to the same host to be respectful to servers"""
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            last_request = self._host_last_request.get(host)
+            if last_request is not None:
+                delay = last_request + self.host_delay - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self._host_last_request[host] = time.monotonic()
+    
     async def _fetch_rss_feed(self, url: str) -> List[Dict]:
         """Fetch and parse a single RSS feed"""
+        host = urlparse(url).netloc
         try:
-            # Fetch RSS feed
-            response = await asyncio.to_thread(requests.get, url, timeout=30)
+            # Fetch RSS feed, conditionally if we have validators for it
+            cached = self.feed_cache.get(url)
+            response = await self._get_client().get(
+                url,
+                headers=self.feed_cache.conditional_headers(url)
+            )
+            
+            if response.status_code == 304 and cached:
+                logger.info(f"Feed not modified: {url}")
+                FEED_FETCHES.inc(feed=host, result="not_modified")
+                return cached["articles"]
+            
             response.raise_for_status()
             
-            # Parse feed
-            feed = feedparser.parse(response.content)
+            body_hash = hashlib.sha256(response.content).hexdigest()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if cached and cached["body_hash"] == body_hash:
+                logger.info(f"Feed body unchanged: {url}")
+                if (etag, last_modified) != (cached.get("etag"), cached.get("last_modified")):
+                    self.feed_cache.update(url, etag, last_modified, body_hash, cached["articles"])
+                FEED_FETCHES.inc(feed=host, result="unchanged")
+                return cached["articles"]
             
-            articles = []
-            for entry in feed.entries[:20]:  # Limit to 20 articles per source
-                try:
-                    # Extract and clean content
-                    content = self._extract_content(entry)
-                    
-                    if len(content.strip()) < 100:  # Skip very short articles
-                        continue
-                    
-                    article = {
-                        "title": entry.get("title", "").strip(),
-                        "content": content,
-                        "url": entry.get("link", ""),
-                        "published": self._parse_date(entry),
-                        "source": self._extract_source_name(url)
-                    }
-                    
-                    articles.append(article)
-                    
-                except Exception as e:
-                    logger.warning(f"Error processing entry: {e}")
-                    continue
+            # Parse and clean the entries on the parser pool
+            articles = await self.parser_pool.parse(response.content, self._extract_source_name(url))
             
+            self.feed_cache.update(url, etag, last_modified, body_hash, articles)
+            FEED_FETCHES.inc(feed=host, result="fetched")
             return articles
             
         except Exception as e:
             logger.error(f"Error fetching RSS feed {url}: {e}")
+            FEED_FETCHES.inc(feed=host, result="error")
             return []
     
-    def _extract_content(self, entry) -> str:
-        """Extract and clean article content"""
-        content = ""
-        
-        # Try different content fields
-        if hasattr(entry, 'content') and entry.content:
-            content = entry.content[0].value
-        elif hasattr(entry, 'summary') and entry.summary:
-            content = entry.summary
-        elif hasattr(entry, 'description') and entry.description:
-            content = entry.description
-        
-        # Clean HTML tags
-        if content:
-            soup = BeautifulSoup(content, 'html.parser')
-            content = soup.get_text()
-            
-            # Clean up whitespace
-            content = re.sub(r'\s+', ' ', content).strip()
-        
-        return content
-    
-    def _parse_date(self, entry) -> str:
-        """Parse and format publication date"""
-        try:
-            if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                dt = datetime(*entry.published_parsed[:6])
-                return dt.isoformat()
-            elif hasattr(entry, 'published') and entry.published:
-                return entry.published
-            else:
-                return datetime.now().isoformat()
-        except:
-            return datetime.now().isoformat()
-    
     def _extract_source_name(self, url: str) -> str:
         """Extract source name from URL"""
         try:
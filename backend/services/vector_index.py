@@ -0,0 +1,305 @@
+import os
+import json
+import mmap
+import shutil
+import logging
+from array import array
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from services.bm25_index import BM25Index, BM25Writer
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.bin"
+OFFSETS_FILE = "offsets.npy"
+VECTORS_FILE = "vectors.bin"
+PUBLISHED_FILE = "published.npy"
+META_FILE = "meta.json"
+
+# Supported INDEX_TYPE values
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+
+# k-means needs at least this many points per centroid, and works best with a few hundred
+MIN_TRAINING_POINTS_PER_CENTROID = 39
+TRAINING_POINTS_PER_CENTROID = 256
+
+# 8-bit PQ codebooks have 256 centroids per sub-quantizer
+MIN_PQ_TRAINING_POINTS = 256
+
+ADD_BATCH_SIZE = 65536
+
+# Columns stored for every chunk, in on-disk order
+CHUNK_FIELDS = ("text", "title", "url", "published", "source", "alternates")
+
+# Columns of snapshots written before meta.json recorded them
+LEGACY_CHUNK_FIELDS = ("text", "title", "url", "published", "source")
+
+def parse_published(value: str) -> Optional[float]:
+    """Parse an article's published field (ISO 8601 or RFC 822) into UTC epoch seconds"""
+    if not value:
+        return None
+    try:
+        published = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            published = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return published.timestamp()
+
+class ChunkStore:
+    """Memory-mapped, columnar chunk text and metadata keyed by FAISS row id.
+
+    All field values are stored back to back as UTF-8 in ``chunks.bin``. The
+    offset table in ``offsets.npy`` holds ``len(fields)`` start offsets per
+    row plus a final end offset, so reading a row touches only its own bytes.
+    Both files are mapped read-only and shared between processes through the OS
+    page cache.
+    """
+
+    def __init__(self, path: str, fields: Tuple[str, ...] = CHUNK_FIELDS):
+        self.path = path
+        self.fields = tuple(fields)
+        self._offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self._file = open(os.path.join(path, CHUNKS_FILE), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return (len(self._offsets) - 1) // len(self.fields)
+
+    def get(self, row: int) -> Dict[str, str]:
+        """Read all fields of one row"""
+        base = row * len(self.fields)
+        bounds = self._offsets[base:base + len(self.fields) + 1]
+        return {
+            field: self._data[bounds[i]:bounds[i + 1]].decode("utf-8")
+            for i, field in enumerate(self.fields)
+        }
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+class ChunkStoreWriter:
+    """Appends rows to a new chunk store"""
+
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._file = open(os.path.join(path, CHUNKS_FILE), "wb")
+        self._offsets = [0]
+        self._position = 0
+
+    def append(self, chunk: Dict[str, str]):
+        for field in CHUNK_FIELDS:
+            data = str(chunk.get(field) or "").encode("utf-8")
+            self._file.write(data)
+            self._position += len(data)
+            self._offsets.append(self._position)
+
+    def close(self):
+        self._file.close()
+        np.save(os.path.join(self.path, OFFSETS_FILE), np.array(self._offsets, dtype=np.int64))
+
+class VectorIndex:
+    """A read-only index snapshot: FAISS index, raw vectors, chunk store and BM25 index, row for row
+
+    ``published`` holds each row's publication time as epoch seconds (NaN when
+    unknown) in its own float64 column, so hits can be filtered and scored by
+    time without decoding their chunks.
+    """
+
+    def __init__(self, index, vectors: np.ndarray, chunks: ChunkStore, path: str, index_type: str,
+                 bm25: Optional[BM25Index] = None, published: Optional[np.ndarray] = None):
+        self.index = index
+        self.chunks = chunks
+        self.bm25 = bm25
+        self.path = path
+        self.index_type = index_type
+        self.published = published if published is not None else self._read_published(chunks)
+        self._vectors = vectors
+
+    @classmethod
+    def load(cls, path: str) -> "VectorIndex":
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        index = faiss.read_index(
+            os.path.join(path, INDEX_FILE),
+            faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        )
+        vectors = np.memmap(
+            os.path.join(path, VECTORS_FILE),
+            dtype=np.float32,
+            mode="r",
+            shape=(meta["count"], meta["dim"])
+        )
+        chunks = ChunkStore(path, meta.get("chunk_fields", LEGACY_CHUNK_FIELDS))
+        published_path = os.path.join(path, PUBLISHED_FILE)
+        published = np.load(published_path, mmap_mode="r") if os.path.exists(published_path) else None
+        return cls(index, vectors, chunks, path, meta["index_type"], BM25Index.load(path), published)
+
+    @staticmethod
+    def _read_published(chunks: ChunkStore) -> np.ndarray:
+        """Publication times of a snapshot written before they had their own column"""
+        times = [parse_published(chunks.get(row)["published"]) for row in range(len(chunks))]
+        return np.array([np.nan if value is None else value for value in times], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    def search(self, vectors: np.ndarray, k: int, nprobe: int = 0, ef_search: int = 0,
+               refine: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """Return squared L2 distances and row ids of the top ``k`` for each query vector, -1 padded
+
+        ``nprobe`` (IVF modes) and ``ef_search`` (HNSW) trade recall for latency
+        per call; 0 keeps the value the index was built with. For ivfpq,
+        ``refine`` > 1 fetches ``refine * k`` candidates by their PQ codes and
+        re-ranks them by exact distance to the stored vectors.
+        """
+        params = None
+        if self.index_type in ("ivf", "ivfpq") and nprobe:
+            params = faiss.SearchParametersIVF(nprobe=nprobe)
+        elif self.index_type == "hnsw" and ef_search:
+            params = faiss.SearchParametersHNSW(efSearch=ef_search)
+        if self.index_type != "ivfpq" or refine <= 1:
+            return self.index.search(vectors, k, params=params)
+
+        _, candidates = self.index.search(vectors, k * refine, params=params)
+        return self._refine(vectors, candidates, k)
+
+    def _refine(self, vectors: np.ndarray, candidates: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top ``k`` of each query's candidate rows"""
+        distances = np.full((len(vectors), k), np.inf, dtype=np.float32)
+        rows = np.full((len(vectors), k), -1, dtype=np.int64)
+        for i, (query, query_rows) in enumerate(zip(vectors, candidates)):
+            query_rows = query_rows[query_rows != -1]
+            if not len(query_rows):
+                continue
+            exact = ((self.vectors(query_rows) - query) ** 2).sum(axis=1)
+            order = np.argsort(exact)[:k]
+            distances[i, :len(order)] = exact[order]
+            rows[i, :len(order)] = query_rows[order]
+        return distances, rows
+
+    def vectors(self, rows: List[int]) -> np.ndarray:
+        """Exact stored vectors for the given rows, whatever the index type"""
+        return np.asarray(self._vectors[np.asarray(rows, dtype=np.int64)])
+
+class VectorIndexWriter:
+    """Builds a new snapshot directory one batch at a time.
+
+    Vectors are appended to ``vectors.bin`` as they arrive; the FAISS index is
+    built from that file in ``close()``, which is where IVF centroids and PQ
+    codebooks get trained. Chunk text is indexed for BM25 under the same row ids.
+    """
+
+    def __init__(self, path: str, index_type: str = "flat", nlist: int = 0, pq_m: int = 0, hnsw_m: int = 32):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{index_type}', expected one of {', '.join(INDEX_TYPES)}")
+        self.path = path
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.hnsw_m = hnsw_m
+        self.dim = None
+        self.count = 0
+        self._chunks = ChunkStoreWriter(path)
+        self._published = array("d")
+        self._bm25 = BM25Writer()
+        self._vectors = open(os.path.join(path, VECTORS_FILE), "wb")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, vectors: np.ndarray, chunks: List[Dict[str, str]]) -> List[int]:
+        """Add a batch of vectors and their chunks, returning the assigned row ids"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+
+        start = self.count
+        self._vectors.write(vectors.tobytes())
+        for row, chunk in enumerate(chunks, start):
+            self._chunks.append(chunk)
+            published = parse_published(chunk.get("published") or "")
+            self._published.append(np.nan if published is None else published)
+            self._bm25.add(row, chunk.get("text") or "")
+        self.count += len(chunks)
+        return list(range(start, self.count))
+
+    def discard(self):
+        """Close the files of a writer that ended up empty and remove its directory"""
+        self._chunks.close()
+        self._vectors.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def close(self):
+        """Flush the chunk store and vectors, then train and write the FAISS and BM25 indexes"""
+        self._chunks.close()
+        self._vectors.close()
+        if self.count == 0:
+            raise ValueError("No documents to process")
+
+        self._bm25.close(self.path)
+        np.save(os.path.join(self.path, PUBLISHED_FILE), np.frombuffer(self._published, dtype=np.float64))
+
+        vectors = np.memmap(os.path.join(self.path, VECTORS_FILE), dtype=np.float32, mode="r",
+                            shape=(self.count, self.dim))
+        index_type, spec = self._index_spec()
+        logger.info(f"Building {spec} index over {self.count} vectors")
+        index = faiss.index_factory(self.dim, spec, faiss.METRIC_L2)
+
+        if not index.is_trained:
+            sample_size = min(self.count, TRAINING_POINTS_PER_CENTROID * self._nlist())
+            sample = np.random.default_rng(0).choice(self.count, size=sample_size, replace=False)
+            index.train(np.ascontiguousarray(vectors[np.sort(sample)]))
+
+        for start in range(0, self.count, ADD_BATCH_SIZE):
+            index.add(np.ascontiguousarray(vectors[start:start + ADD_BATCH_SIZE]))
+
+        faiss.write_index(index, os.path.join(self.path, INDEX_FILE))
+        with open(os.path.join(self.path, META_FILE), "w") as f:
+            json.dump({
+                "dim": self.dim,
+                "count": self.count,
+                "index_type": index_type,
+                "index_spec": spec,
+                "chunk_fields": list(CHUNK_FIELDS)
+            }, f)
+
+    def _nlist(self) -> int:
+        """Number of IVF lists, by default about 4 * sqrt(n) with enough points to train each"""
+        nlist = self.nlist or int(4 * np.sqrt(self.count))
+        return max(1, min(nlist, self.count // MIN_TRAINING_POINTS_PER_CENTROID))
+
+    def _pq_m(self) -> int:
+        """Number of PQ sub-quantizers, which must divide the dimension"""
+        m = self.pq_m or max(1, self.dim // 8)
+        while self.dim % m:
+            m -= 1
+        return m
+
+    def _index_spec(self) -> Tuple[str, str]:
+        """Pick the index_factory string, falling back to flat when there is too little data to train"""
+        if self.index_type == "hnsw":
+            return "hnsw", f"HNSW{self.hnsw_m}"
+        if self.index_type == "ivf":
+            if self.count >= MIN_TRAINING_POINTS_PER_CENTROID:
+                return "ivf", f"IVF{self._nlist()},Flat"
+        if self.index_type == "ivfpq":
+            if self.count >= MIN_PQ_TRAINING_POINTS:
+                # "np" skips polysemous training, which costs most of the build and search never uses
+                return "ivfpq", f"IVF{self._nlist()},PQ{self._pq_m()}np"
+        if self.index_type != "flat":
+            logger.warning(f"Only {self.count} vectors, too few to train a {self.index_type} index; using flat")
+        return "flat", "Flat"
@@ -0,0 +1,51 @@
+"""ONNX embedding backends agree with full-precision PyTorch.
+
+A smaller version of ``benchmarks.embedding_parity``, with its thresholds.
+Skipped unless onnxruntime, tokenizers and sentence-transformers are installed
+and the model can be read from the Hugging Face cache or downloaded.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+pytest.importorskip("sentence_transformers")
+
+from benchmarks.embedding_parity import embed, load_backend, make_texts, neighbours
+from services.embedding_backends import DEFAULT_EMBEDDING_MODEL
+
+TEXTS = 200
+QUERIES = 50
+K = 10
+MIN_COSINE = 0.99
+MIN_RECALL = 0.9
+
+@pytest.fixture(scope="module")
+def corpus():
+    texts = make_texts(TEXTS, seed=0)
+    queries = [text.split(". ")[0] for text in texts[:QUERIES]]
+    return texts, queries
+
+@pytest.fixture(scope="module")
+def reference(corpus):
+    texts, queries = corpus
+    try:
+        embeddings = load_backend("torch", DEFAULT_EMBEDDING_MODEL, 0)
+    except OSError as e:
+        pytest.skip(f"{DEFAULT_EMBEDDING_MODEL} is not available: {e}")
+    return embed(embeddings, texts, 64), embed(embeddings, queries, 64)
+
+@pytest.mark.parametrize("spec", ["onnx", "onnx-int8"])
+def test_onnx_matches_torch(spec, corpus, reference):
+    texts, queries = corpus
+    reference_docs, reference_queries = reference
+    candidate = load_backend(spec, DEFAULT_EMBEDDING_MODEL, 0)
+    docs = embed(candidate, texts, 64)
+
+    cosines = np.sum(docs * reference_docs, axis=1)
+    assert cosines.mean() >= MIN_COSINE, f"{spec} mean cosine {cosines.mean():.4f}"
+
+    found = neighbours(docs, embed(candidate, queries, 64), K)
+    truth = neighbours(reference_docs, reference_queries, K)
+    recall = np.mean([len(set(f) & set(t)) / K for f, t in zip(found, truth)])
+    assert recall >= MIN_RECALL, f"{spec} recall@{K} {recall:.3f}"
@@ -0,0 +1,79 @@
+"""FeedScheduler against local feeds that publish at different rates, on a fake clock."""
+import asyncio
+
+import pytest
+
+from benchmarks.scheduler_simulation import FakeClock
+from benchmarks.stub_servers import PublishingFeedServer
+from services.feed_cache import FeedCache
+from services.feed_scheduler import FeedScheduler
+from services.rss_service import RSSService
+
+BUSY, QUIET, SILENT = 0, 1, 2
+# Seconds between new articles of each feed; the silent one never publishes after its first article
+PERIODS = [300, 21600, 10 ** 9]
+HOURS = 12
+TICK = 30
+
+@pytest.fixture(scope="module")
+def simulation(tmp_path_factory):
+    """Poll the feeds for HOURS of fake time, returning the scheduler, server and found items per feed"""
+    mp = pytest.MonkeyPatch()
+    mp.setenv("RSS_HOST_DELAY", "0")
+    clock = FakeClock(1_700_000_000.0)
+    server = PublishingFeedServer(PERIODS, clock.time, words=50).start()
+
+    async def run():
+        # Keep stub feeds out of the real data/feed_cache.json
+        rss_service = RSSService(feed_cache=FeedCache(str(tmp_path_factory.mktemp("scheduler") / "feed_cache.json")))
+        rss_service.rss_sources = server.feed_urls
+        scheduler = FeedScheduler(rss_service, clock=clock.time)
+        found = {feed: [] for feed in range(len(PERIODS))}
+        last_polls = {feed: [] for feed in range(len(PERIODS))}
+        end = clock.time() + HOURS * 3600
+        try:
+            while clock.time() < end:
+                for article in await scheduler.poll_due():
+                    feed, item = (int(part) for part in article["url"].rsplit("/", 2)[-2:])
+                    found[feed].append(item)
+                for feed, url in enumerate(server.feed_urls):
+                    last_poll = scheduler.feeds[url].last_poll
+                    if last_poll is not None and last_poll not in last_polls[feed]:
+                        last_polls[feed].append(last_poll)
+                clock.advance(TICK)
+        finally:
+            await rss_service.close()
+        return scheduler, found, last_polls
+
+    try:
+        yield (server, *asyncio.run(run()))
+    finally:
+        server.stop()
+        mp.undo()
+
+def interval(simulation, feed: int) -> float:
+    server, scheduler, _, _ = simulation
+    return scheduler.feeds[server.feed_urls[feed]].interval
+
+def test_quiet_feeds_back_off(simulation):
+    scheduler = simulation[1]
+    assert interval(simulation, SILENT) == scheduler.max_interval
+    assert interval(simulation, QUIET) > scheduler.initial_interval
+
+def test_busy_feeds_tighten(simulation):
+    scheduler = simulation[1]
+    assert interval(simulation, BUSY) < scheduler.initial_interval
+    assert interval(simulation, BUSY) >= scheduler.min_interval
+
+def test_busy_feeds_are_polled_more_often(simulation):
+    _, _, _, last_polls = simulation
+    assert len(last_polls[BUSY]) > 2 * len(last_polls[QUIET])
+    assert len(last_polls[QUIET]) >= len(last_polls[SILENT])
+
+def test_no_items_lost(simulation):
+    server, _, found, last_polls = simulation
+    for feed in range(len(PERIODS)):
+        # Everything published up to the feed's last poll was returned exactly once
+        last_poll = last_polls[feed][-1]
+        published = {item for item in range(server.latest_item(feed) + 1) if server.published_at(feed, item) <= last_poll}
+        assert sorted(found[feed]) == sorted(published), f"feed {feed} missed {sorted(published - set(found[feed]))}"
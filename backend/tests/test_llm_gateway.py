@@ -0,0 +1,117 @@
+"""LLMGateway against the local stub OpenAI-compatible server."""
+import asyncio
+import time
+
+import openai
+import pytest
+
+from benchmarks.llm_gateway_benchmark import counter_value
+from benchmarks.stub_servers import StubLLMServer
+from services.llm_gateway import LLM_HEDGES, LLMGateway, LLMSaturated
+
+@pytest.fixture
+def gateway_env(monkeypatch):
+    """Gateway settings for a fast test; hedging off unless a test turns it on"""
+    settings = {
+        "LLM_MAX_CONCURRENCY": "16",
+        "LLM_MAX_WAITING": "64",
+        "LLM_QUEUE_TIMEOUT": "2",
+        "LLM_TIMEOUT": "10",
+        "LLM_HEDGE_DELAY": "0",
+        "LLM_MAX_RETRIES": "1",
+        "LLM_RETRY_BACKOFF": "0.01"
+    }
+
+    def configure(**overrides):
+        for name, value in {**settings, **overrides}.items():
+            monkeypatch.setenv(name, str(value))
+
+    return configure
+
+def run(server: StubLLMServer, scenario):
+    """Run ``scenario(gateway)`` against a started stub server, then shut both down"""
+
+    async def main():
+        gateway = LLMGateway("stub")
+        gateway.load("test", server.base_url)
+        try:
+            return await scenario(gateway)
+        finally:
+            await gateway.close()
+
+    try:
+        return asyncio.run(main())
+    finally:
+        server.stop()
+
+def prompt(text: str):
+    return [{"role": "user", "content": text}]
+
+def test_identical_prompts_share_one_request(gateway_env):
+    gateway_env()
+    server = StubLLMServer(latency=0.2).start()
+
+    async def scenario(gateway):
+        return await asyncio.gather(*(gateway.complete(prompt("What happened today?")) for _ in range(10)))
+
+    answers = run(server, scenario)
+    assert len(set(answers)) == 1
+    assert server.requests == 1
+
+def test_burst_above_concurrency_is_rejected_quickly(gateway_env):
+    gateway_env(LLM_MAX_CONCURRENCY=2, LLM_MAX_WAITING=2, LLM_QUEUE_TIMEOUT=0.2)
+    server = StubLLMServer(latency=1.0).start()
+    saturated = []
+
+    async def call(gateway, n):
+        start = time.perf_counter()
+        try:
+            await gateway.complete(prompt(f"Burst question {n}?"))
+        except LLMSaturated:
+            saturated.append(time.perf_counter() - start)
+
+    async def scenario(gateway):
+        await asyncio.gather(*(call(gateway, n) for n in range(10)))
+
+    run(server, scenario)
+    # Two calls hold the slots; the two that queue time out, the rest are turned away at once
+    assert len(saturated) == 8
+    assert max(saturated) < 0.2 + 0.15
+    assert server.requests == 2
+
+def test_client_errors_are_not_retried(gateway_env):
+    gateway_env(LLM_MAX_RETRIES=2)
+    server = StubLLMServer(latency=0.01, error_ratio=1.0, error_status=400).start()
+
+    async def scenario(gateway):
+        with pytest.raises(openai.BadRequestError):
+            await gateway.complete(prompt("Bad request?"))
+
+    run(server, scenario)
+    assert server.requests == 1
+
+def test_server_errors_are_retried(gateway_env):
+    gateway_env(LLM_MAX_RETRIES=2)
+    server = StubLLMServer(latency=0.01, error_ratio=1.0).start()
+
+    async def scenario(gateway):
+        with pytest.raises(openai.InternalServerError):
+            await gateway.complete(prompt("Server error?"))
+
+    run(server, scenario)
+    assert server.requests == 3
+
+def test_slow_attempt_is_hedged(gateway_env):
+    gateway_env(LLM_HEDGE_DELAY=0.1)
+    server = StubLLMServer(latency=0.05, slow_requests=1, slow_latency=3.0).start()
+    won = counter_value(LLM_HEDGES, result="won")
+
+    async def scenario(gateway):
+        start = time.perf_counter()
+        await gateway.complete(prompt("Slow question?"))
+        return time.perf_counter() - start
+
+    elapsed = run(server, scenario)
+    assert elapsed < 1.0
+    assert server.requests == 2
+    assert counter_value(LLM_HEDGES, result="won") == won + 1
@@ -0,0 +1,109 @@
+"""Incremental rebuilds of the time-partitioned index, with hashing embeddings."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from benchmarks.pipeline_benchmark import HashingEmbeddings
+from services.feed_parser import parse_feed
+from services.rag_service import RAGService
+
+NOW = datetime.now(timezone.utc)
+
+def article(n: int, hours_ago: float = 1, version: int = 0, published: bool = True):
+    rng = np.random.default_rng([n, version])
+    return {
+        "title": f"Story {n}",
+        "url": f"http://news.example/{n}",
+        "content": " ".join(f"term{i}" for i in rng.integers(5000, size=300)),
+        "published": (NOW - timedelta(hours=hours_ago)).isoformat() if published else "",
+        "source": "Example"
+    }
+
+@pytest.fixture
+def rag(tmp_path, monkeypatch):
+    """RAG service with an empty data directory and no LLM"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("INDEX_PARTITION_HOURS", "24")
+    monkeypatch.setenv("INDEX_RETENTION_DAYS", "30")
+    service = RAGService()
+    service._create_embeddings = HashingEmbeddings
+    asyncio.run(service.initialize())
+    return service
+
+def rebuild(rag, articles, incremental=True):
+    return asyncio.run(rag.rebuild_index(articles, incremental=incremental))
+
+def id_map(rag):
+    return rag._read_id_map(rag.vectorstore)
+
+def test_unchanged_articles_are_not_embedded(rag):
+    articles = [article(n, hours_ago=n * 10) for n in range(4)]
+    first = rebuild(rag, articles, incremental=False)
+    assert first["added"] == first["chunks"] > 0
+
+    second = rebuild(rag, articles)
+    assert second["added"] == 0
+    assert second["removed"] == 0
+    assert second["unchanged"] == first["chunks"]
+
+def test_changed_article_replaces_its_stale_chunks(rag):
+    articles = [article(n) for n in range(3)]
+    rebuild(rag, articles, incremental=False)
+    old_rows = len(id_map(rag)[articles[1]["url"]]["rows"])
+
+    articles[1] = article(1, version=1)
+    result = rebuild(rag, articles)
+    assert result["added"] == len(id_map(rag)[articles[1]["url"]]["rows"])
+    assert result["removed"] == old_rows
+    assert len(rag.vectorstore) == result["chunks"]
+
+def test_republished_article_moves_partition(rag):
+    articles = [article(0, hours_ago=1), article(1, hours_ago=1)]
+    rebuild(rag, articles, incremental=False)
+    before = id_map(rag)[articles[1]["url"]]["partition"]
+
+    articles[1] = article(1, hours_ago=72)
+    result = rebuild(rag, articles)
+    after = id_map(rag)[articles[1]["url"]]["partition"]
+    assert after != before
+    assert after in rag.vectorstore.partitions
+    assert result["removed"] == result["added"]
+    assert len(rag.vectorstore) == result["chunks"]
+
+def test_partitions_past_retention_expire(rag):
+    articles = [article(0, hours_ago=1), article(1, hours_ago=24 * 5)]
+    rebuild(rag, articles, incremental=False)
+    old = id_map(rag)[articles[1]["url"]]
+    assert len(rag.vectorstore.partitions) == 2
+
+    rag.retention_days = 3
+    result = rebuild(rag, [articles[0]])
+    assert result["expired"] == len(old["rows"])
+    assert old["partition"] not in rag.vectorstore.partitions
+    assert articles[1]["url"] not in id_map(rag)
+
+def test_undated_articles_are_stable(rag):
+    articles = [article(0), article(1, published=False)]
+    rebuild(rag, articles, incremental=False)
+    entry = id_map(rag)[articles[1]["url"]]
+    chunk = rag.vectorstore.partitions[entry["partition"]].chunks.get(entry["rows"][0])
+    assert chunk["published"]
+
+    result = rebuild(rag, articles)
+    assert result["added"] == 0
+    assert id_map(rag)[articles[1]["url"]] == entry
+
+def test_undated_feed_entries_parse_identically():
+    feed = (
+        '<?xml version="1.0"?><rss version="2.0"><channel><title>Feed</title>'
+        '<item><title>Undated</title><link>http://news.example/undated</link>'
+        f'<description>{"An undated story about the harbour. " * 10}</description></item>'
+        '</channel></rss>'
+    ).encode("utf-8")
+    first, _ = parse_feed(feed, "Example", "regex")
+    second, _ = parse_feed(feed, "Example", "regex")
+    assert first == second
+    assert first[0]["published"] == ""
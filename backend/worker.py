@@ -0,0 +1,24 @@
+import argparse
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+from services.ingest_worker import IngestWorker
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Run the ingest worker that processes queued index rebuilds"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--parent", type=int, help="Exit when this parent process exits")
+    args = parser.parse_args()
+
+    asyncio.run(IngestWorker().run(parent_pid=args.parent))
+
+if __name__ == "__main__":
+    main()